@@ -6,6 +6,8 @@ that are common across all chess engine implementations.
 """
 
 import chess
+from collections import Counter
+from itertools import islice
 from typing import Optional
 from dataclasses import dataclass
 
@@ -41,6 +43,8 @@ class TTEntry:
 INFINITY = 999999
 MATE_SCORE = 100000
 TT_SIZE = 1 << 20  # 1 million entries
+TT_MASK = TT_SIZE - 1  # Slot index mask for fixed-size tables
+EVAL_CACHE_SIZE = 1 << 16  # Cached static evaluations before the cache is cleared
 
 
 # Center squares
@@ -71,13 +75,78 @@ def get_game_phase(board: chess.Board) -> float:
     Returns:
         float: 0.0 in opening, gradually increases to 1.0 in endgame
     """
-    phase = 0
-    phase += len(board.pieces(chess.KNIGHT, chess.WHITE)) * 1
-    phase += len(board.pieces(chess.KNIGHT, chess.BLACK)) * 1
-    phase += len(board.pieces(chess.BISHOP, chess.WHITE)) * 1
-    phase += len(board.pieces(chess.BISHOP, chess.BLACK)) * 1
-    phase += len(board.pieces(chess.ROOK, chess.WHITE)) * 2
-    phase += len(board.pieces(chess.ROOK, chess.BLACK)) * 2
-    phase += len(board.pieces(chess.QUEEN, chess.WHITE)) * 4
-    phase += len(board.pieces(chess.QUEEN, chess.BLACK)) * 4
-    return 1.0 - min(phase / 24.0, 1.0)
+    return 1.0 - get_phase_step(board) / 24.0
+
+
+def get_phase_step(board: chess.Board) -> int:
+    """
+    Calculate the remaining phase material as an integer step.
+
+    Counts knights and bishops as 1, rooks as 2 and queens as 4 with one
+    popcount per piece bitboard, clamped to 24. get_game_phase() is
+    1.0 - step / 24.0, and the step indexes engine_pst.PST_FLAT directly.
+
+    Args:
+        board: The chess board to evaluate
+
+    Returns:
+        int: 24 in the opening, decreasing to 0 as material is traded
+    """
+    return min(chess.popcount(board.knights | board.bishops)
+               + 2 * chess.popcount(board.rooks)
+               + 4 * chess.popcount(board.queens), 24)
+
+
+def encode_move(move: chess.Move) -> int:
+    """
+    Pack a move into an int for cheap equality tests (killer tables).
+
+    Args:
+        move: The move to pack
+
+    Returns:
+        int: from | to << 6 | promotion << 12, never 0 for a real move
+    """
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def trim_tt(tt: dict, max_entries: int) -> None:
+    """
+    Make room in a dict transposition table before a search: once it holds
+    more than half of max_entries, drop the least recently stored entries
+    down to half. Stores pop and re-insert their key, so dict order is
+    recency order.
+
+    Args:
+        tt: Transposition table, modified in place
+        max_entries: The table's size cap
+    """
+    excess = len(tt) - max_entries // 2
+    if excess > 0:
+        for key in list(islice(tt, excess)):
+            del tt[key]
+
+
+def trim_tt_by_age(tt: dict, max_entries: int) -> None:
+    """
+    Make room in an age-stamped transposition table before a search: once it
+    holds more than half of max_entries, drop whole searches' entries, oldest
+    age first, until at most half remain. The latest search's are always kept.
+
+    Args:
+        tt: Transposition table of entries with an age field, modified in place
+        max_entries: The table's size cap
+    """
+    size = len(tt)
+    if size <= max_entries // 2:
+        return
+    counts = Counter(entry.age for entry in tt.values())
+    ages = sorted(counts)
+    min_age = ages[-1]
+    for age in ages[:-1]:
+        if size <= max_entries // 2:
+            min_age = age
+            break
+        size -= counts[age]
+    for key in [key for key, entry in tt.items() if entry.age < min_age]:
+        del tt[key]
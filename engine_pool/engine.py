@@ -5,14 +5,19 @@ Designed for competitive play.
 """
 
 import chess
+import os
+import sys
 import time
-from collections import defaultdict
+from array import array
+
+# Add parent directory to path to import the shared engine_base and engine_pst modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from engine_base import (
-    SearchResult, TTEntry, TT_EXACT, TT_ALPHA, TT_BETA,
-    INFINITY, MATE_SCORE, TT_SIZE, CENTER, EXTENDED_CENTER,
-    PASSED_PAWN_BONUS, get_game_phase
+    SearchResult, TT_EXACT, TT_ALPHA, TT_BETA,
+    INFINITY, MATE_SCORE, TT_SIZE, TT_MASK, EVAL_CACHE_SIZE, CENTER, EXTENDED_CENTER,
+    PASSED_PAWN_BONUS, encode_move, get_phase_step
 )
-from engine_pst import get_pst_value
+from engine_pst import PST_FLAT
 
 
 class ChessEngine:
@@ -51,20 +56,45 @@ class ChessEngine:
         chess.QUEEN: 1,
     }
 
+    ASPIRATION_WINDOW = 100  # Initial half-width around the previous iteration's score
+    ASPIRATION_MAX = 400    # Beyond this, fall back to a full window
+
     def __init__(self, max_depth: int = 6, time_limit: float = None):
         self.max_depth = max_depth
         self.time_limit = time_limit
         self.nodes_searched = 0
         self.start_time = 0
         self.time_exceeded = False
-        self.tt = {}
-        self.killers = [[None, None] for _ in range(64)]
-        self.history = defaultdict(int)
+        self.clear_tt()
+        # Two packed killer moves per ply (see encode_move): slots [2 * ply] and [2 * ply + 1]
+        self.killers = array('I', bytes(4 * 2 * 64))
+        self.history = array('q', bytes(8 * 64 * 64))  # Indexed by from_square * 64 + to_square
+        self.eval_cache = {}  # Static evaluations by board._transposition_key()
+
+        # MVV-LVA capture scores, indexed by victim_type * 8 + attacker_type
+        self.mvv_lva = [0] * 64
+        for victim in chess.PIECE_TYPES:
+            for attacker in chess.PIECE_TYPES:
+                self.mvv_lva[victim * 8 + attacker] = self.PIECE_VALUES[victim] * 10 - self.PIECE_VALUES[attacker]
+
+    def clear_tt(self):
+        """
+        Allocate an empty transposition table: fixed-size parallel arrays
+        indexed by hash(key[:-1]) & TT_MASK, always replaced on store. The
+        trailing en passant field is left out of the index because hash(None)
+        differs between runs; the full key is kept to tell collisions apart.
+        """
+        self.tt_keys = [None] * TT_SIZE
+        self.tt_moves = [None] * TT_SIZE
+        self.tt_depth = array('b', bytes(TT_SIZE))
+        self.tt_score = array('i', bytes(4 * TT_SIZE))
+        self.tt_flag = array('b', bytes(TT_SIZE))
 
     def clear_tables(self):
-        self.tt.clear()
-        self.killers = [[None, None] for _ in range(64)]
-        self.history.clear()
+        self.clear_tt()
+        self.killers = array('I', bytes(4 * 2 * 64))
+        self.history = array('q', bytes(8 * 64 * 64))
+        self.eval_cache.clear()
 
     def evaluate_development(self, board: chess.Board, phase: float) -> int:
         """Evaluate piece development (important in opening/early middlegame)."""
@@ -168,13 +198,11 @@ class ChessEngine:
             attacks_center = 0
 
             for sq in CENTER:
-                attackers = board.attackers(color, sq)
-                attacks_center += len(attackers) * 5
+                attacks_center += chess.popcount(board.attackers_mask(color, sq)) * 5
 
             for sq in EXTENDED_CENTER:
                 if sq not in CENTER:
-                    attackers = board.attackers(color, sq)
-                    attacks_center += len(attackers) * 2
+                    attacks_center += chess.popcount(board.attackers_mask(color, sq)) * 2
 
             score += sign * attacks_center
 
@@ -191,8 +219,7 @@ class ChessEngine:
             for pt in [chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]:
                 for sq in board.pieces(pt, color):
                     # Count squares this piece attacks
-                    attacks = board.attacks(sq)
-                    mobility = bin(attacks).count('1')
+                    mobility = chess.popcount(board.attacks_mask(sq))
                     score += sign * mobility * self.MOBILITY_BONUS[pt]
 
         return score
@@ -356,7 +383,7 @@ class ChessEngine:
             sign = 1 if color == chess.WHITE else -1
 
             # Bishop pair
-            if len(board.pieces(chess.BISHOP, color)) >= 2:
+            if chess.popcount(board.bishops & board.occupied_co[color]) >= 2:
                 score += sign * 45
 
             # Bad bishop (blocked by own pawns)
@@ -454,7 +481,7 @@ class ChessEngine:
                     elif attackers:
                         # Attacked by lesser piece?
                         min_attacker_value = min(
-                            self.PIECE_VALUES[board.piece_at(att_sq).piece_type]
+                            self.PIECE_VALUES[board.piece_type_at(att_sq)]
                             for att_sq in attackers
                         )
                         if min_attacker_value < self.PIECE_VALUES[pt]:
@@ -463,29 +490,48 @@ class ChessEngine:
         return score
 
     def evaluate(self, board: chess.Board) -> int:
-        """Full position evaluation."""
+        """
+        Full position evaluation. The static part is cached by transposition
+        key; the fifty-move and repetition draws depend on the move history,
+        so they are checked on every call (mate still takes precedence).
+        """
+        key = board._transposition_key()
+        score = self.eval_cache.get(key)
+        if score is None:
+            if len(self.eval_cache) >= EVAL_CACHE_SIZE:
+                self.eval_cache.clear()
+            score = self.eval_cache[key] = self.evaluate_static(board)
+
+        if score != -MATE_SCORE and (board.is_fifty_moves() or board.is_repetition(2)):
+            return 0
+
+        return score
+
+    def evaluate_static(self, board: chess.Board) -> int:
+        """Evaluation of the position alone (no history-dependent draws)."""
         if board.is_checkmate():
             return -MATE_SCORE
 
         if board.is_stalemate() or board.is_insufficient_material():
             return 0
 
-        if board.is_fifty_moves() or board.is_repetition(2):
-            return 0
-
-        phase = get_game_phase(board)
+        step = get_phase_step(board)
+        phase = 1.0 - step / 24.0
         score = 0
 
-        # Material and piece-square tables
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece:
-                value = self.PIECE_VALUES[piece.piece_type]
-                value += get_pst_value(piece, square, phase)
-                if piece.color == chess.WHITE:
-                    score += value
-                else:
-                    score -= value
+        # Material and piece-square tables: walk each piece bitboard once and
+        # read the flat PST block for this phase step
+        piece_values = self.PIECE_VALUES
+        white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+        for pt, pieces in zip(chess.PIECE_TYPES, (board.pawns, board.knights, board.bishops,
+                                                   board.rooks, board.queens, board.kings)):
+            value = piece_values[pt]
+            # Black's block comes first, White's (color == 1) 64 entries later
+            base = (step * 12 + (pt - 1) * 2) * 64
+            for square in chess.scan_forward(pieces & white):
+                score += value + PST_FLAT[base + 64 + square]
+            for square in chess.scan_forward(pieces & black):
+                score -= value + PST_FLAT[base + square]
 
         # Positional evaluation
         score += self.evaluate_development(board, phase)
@@ -505,45 +551,87 @@ class ChessEngine:
 
         return score
 
-    def score_move(self, board: chess.Board, move: chess.Move, ply: int, tt_move: chess.Move = None) -> int:
-        """Score move for ordering."""
-        score = 0
-
-        if tt_move and move == tt_move:
-            return 10000000
-
-        if board.is_capture(move):
-            victim = board.piece_at(move.to_square)
-            attacker = board.piece_at(move.from_square)
+    def order_moves(self, board: chess.Board, moves: list, ply: int, tt_move: chess.Move = None) -> list:
+        """
+        Order moves: hash move, captures by MVV-LVA (en passant as a pawn
+        capture), promotions, this ply's two killers, then history. The tables
+        and killers are bound once per node instead of looked up for every
+        move. Sorted in place (stable, best first).
+        """
+        piece_type_at = board.piece_type_at
+        mvv_lva = self.mvv_lva
+        piece_values = self.PIECE_VALUES
+        history = self.history
+        ep_square = board.ep_square
+        pawns = board.pawns
+        bb_squares = chess.BB_SQUARES
+        if ply < 64:
+            killer1 = self.killers[2 * ply]
+            killer2 = self.killers[2 * ply + 1]
+        else:
+            killer1 = killer2 = -1  # Never an encoded move
+
+        def score_move(move):
+            if tt_move and move == tt_move:
+                return 10000000
+
+            from_square = move.from_square
+            to_square = move.to_square
+            victim = piece_type_at(to_square)
             if victim:
-                score += 1000000 + self.PIECE_VALUES[victim.piece_type] * 10 - self.PIECE_VALUES[attacker.piece_type]
+                score = 1000000 + mvv_lva[victim * 8 + piece_type_at(from_square)]
+            elif to_square == ep_square and pawns & bb_squares[from_square]:
+                score = 1000000 + 100
             else:
-                score += 1000000 + 100
+                score = 0
 
-        if move.promotion:
-            score += 900000 + self.PIECE_VALUES[move.promotion]
+            if move.promotion:
+                score += 900000 + piece_values[move.promotion]
 
-        if ply < 64:
-            if move == self.killers[ply][0]:
+            enc = encode_move(move)
+            if enc == killer1:
                 score += 800000
-            elif move == self.killers[ply][1]:
+            elif enc == killer2:
                 score += 700000
 
-        score += self.history[(move.from_square, move.to_square)]
+            return score + history[from_square * 64 + to_square]
 
-        return score
+        moves.sort(key=score_move, reverse=True)
+        return moves
 
-    def order_moves(self, board: chess.Board, moves: list, ply: int, tt_move: chess.Move = None) -> list:
-        scored = [(self.score_move(board, m, ply, tt_move), m) for m in moves]
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [m for _, m in scored]
+    def order_captures(self, board: chess.Board, moves: list) -> list:
+        """
+        Order quiescence moves (captures and quiet promotions) by MVV-LVA
+        alone: the hash move, killer and history terms of order_moves() only
+        separate quiet moves. Sorted in place, best first.
+        """
+        piece_type_at = board.piece_type_at
+        mvv_lva = self.mvv_lva
+        piece_values = self.PIECE_VALUES
+
+        def score_capture(move):
+            victim = piece_type_at(move.to_square)
+            if victim:
+                score = 1000000 + mvv_lva[victim * 8 + piece_type_at(move.from_square)]
+            elif move.promotion:
+                score = 0
+            else:
+                score = 1000000 + 100  # En passant
+            if move.promotion:
+                score += 900000 + piece_values[move.promotion]
+            return score
+
+        moves.sort(key=score_capture, reverse=True)
+        return moves
 
     def store_killer(self, move: chess.Move, ply: int):
         if ply >= 64:
             return
-        if move != self.killers[ply][0]:
-            self.killers[ply][1] = self.killers[ply][0]
-            self.killers[ply][0] = move
+        enc = encode_move(move)
+        idx = 2 * ply
+        if enc != self.killers[idx]:
+            self.killers[idx + 1] = self.killers[idx]
+            self.killers[idx] = enc
 
     def quiescence(self, board: chess.Board, alpha: int, beta: int, ply: int) -> int:
         self.nodes_searched += 1
@@ -563,17 +651,24 @@ class ChessEngine:
         if stand_pat > alpha:
             alpha = stand_pat
 
-        captures = [m for m in board.legal_moves if board.is_capture(m) or m.promotion]
-        captures = self.order_moves(board, captures, ply)
+        # Only captures and promotions, generated directly rather than filtering
+        # every legal move (quiet promotions are pawn pushes to an empty back rank)
+        captures = list(board.generate_legal_captures())
+        captures.extend(board.generate_legal_moves(board.pawns, chess.BB_BACKRANKS & ~board.occupied))
+        captures = self.order_captures(board, captures)
+
+        piece_type_at = board.piece_type_at
+        piece_values = self.PIECE_VALUES
+        quiescence = self.quiescence
 
         for move in captures:
             if not move.promotion:
-                victim = board.piece_at(move.to_square)
-                if victim and stand_pat + self.PIECE_VALUES[victim.piece_type] + 200 < alpha:
+                victim = piece_type_at(move.to_square)
+                if victim and stand_pat + piece_values[victim] + 200 < alpha:
                     continue
 
             board.push(move)
-            score = -self.quiescence(board, -beta, -alpha, ply + 1)
+            score = -quiescence(board, -beta, -alpha, ply + 1)
             board.pop()
 
             if self.time_exceeded:
@@ -601,28 +696,30 @@ class ChessEngine:
             return 0
 
         key = board._transposition_key()
-        tt_entry = self.tt.get(key)
+        tt_index = hash(key[:-1]) & TT_MASK
         tt_move = None
 
-        if tt_entry and tt_entry.depth >= depth:
-            tt_move = tt_entry.best_move
-            if tt_entry.flag == TT_EXACT:
-                return tt_entry.score
-            elif tt_entry.flag == TT_ALPHA and tt_entry.score <= alpha:
-                return alpha
-            elif tt_entry.flag == TT_BETA and tt_entry.score >= beta:
-                return beta
-        elif tt_entry:
-            tt_move = tt_entry.best_move
+        if self.tt_keys[tt_index] == key:
+            tt_move = self.tt_moves[tt_index]
+            if self.tt_depth[tt_index] >= depth:
+                tt_flag = self.tt_flag[tt_index]
+                tt_score = self.tt_score[tt_index]
+                if tt_flag == TT_EXACT:
+                    return tt_score
+                elif tt_flag == TT_ALPHA and tt_score <= alpha:
+                    return alpha
+                elif tt_flag == TT_BETA and tt_score >= beta:
+                    return beta
 
         if depth <= 0:
             return self.quiescence(board, alpha, beta, ply)
 
         in_check = board.is_check()
 
-        # Null move pruning
-        if do_null and depth >= 3 and not in_check and get_game_phase(board) < 0.8:
-            has_pieces = any(board.pieces(pt, board.turn) for pt in [chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN])
+        # Null move pruning (phase material >= 5, i.e. a game phase below 0.8)
+        if do_null and depth >= 3 and not in_check and get_phase_step(board) >= 5:
+            # Zugzwang guard: side to move must have a non-pawn piece
+            has_pieces = (board.knights | board.bishops | board.rooks | board.queens) & board.occupied_co[board.turn]
             if has_pieces:
                 board.push(chess.Move.null())
                 R = 3 if depth >= 6 else 2
@@ -643,21 +740,35 @@ class ChessEngine:
         best_score = -INFINITY
         flag = TT_ALPHA
 
+        # Bound once per node: each move's capture flag is a bitboard test taken
+        # before the push (afterwards the mover stands on to_square and
+        # board.is_capture() is always true) and reused by LMR and the
+        # history/killer updates (a pawn moving to the ep square captures en passant)
+        them = board.occupied_co[not board.turn]
+        pawns = board.pawns
+        ep_square = board.ep_square
+        bb_squares = chess.BB_SQUARES
+        negamax = self.negamax
+        history = self.history
+
         for i, move in enumerate(moves):
+            to_square = move.to_square
+            is_capture = bool(them & bb_squares[to_square]) or (
+                to_square == ep_square and bool(pawns & bb_squares[move.from_square]))
             board.push(move)
 
-            # LMR
-            if i >= 4 and depth >= 3 and not in_check and not board.is_check() and not board.is_capture(move) and not move.promotion:
-                score = -self.negamax(board, depth - 2, -alpha - 1, -alpha, ply + 1)
+            # LMR (cheap flags first so board.is_check() only runs for reducible moves)
+            if i >= 4 and depth >= 3 and not in_check and not is_capture and not move.promotion and not board.is_check():
+                score = -negamax(board, depth - 2, -alpha - 1, -alpha, ply + 1)
                 if score > alpha:
-                    score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                    score = -negamax(board, depth - 1, -beta, -alpha, ply + 1)
             else:
                 if i == 0:
-                    score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                    score = -negamax(board, depth - 1, -beta, -alpha, ply + 1)
                 else:
-                    score = -self.negamax(board, depth - 1, -alpha - 1, -alpha, ply + 1)
+                    score = -negamax(board, depth - 1, -alpha - 1, -alpha, ply + 1)
                     if score > alpha and score < beta:
-                        score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                        score = -negamax(board, depth - 1, -beta, -alpha, ply + 1)
 
             board.pop()
 
@@ -671,19 +782,20 @@ class ChessEngine:
             if score > alpha:
                 alpha = score
                 flag = TT_EXACT
-                if not board.is_capture(move):
-                    self.history[(move.from_square, move.to_square)] += depth * depth
+                if not is_capture:
+                    history[move.from_square * 64 + move.to_square] += depth * depth
 
             if alpha >= beta:
-                if not board.is_capture(move):
+                if not is_capture:
                     self.store_killer(move, ply)
                 flag = TT_BETA
                 break
 
-        if len(self.tt) < TT_SIZE:
-            self.tt[key] = TTEntry(key, depth, best_score, flag, best_move)
-        elif key in self.tt and depth >= self.tt[key].depth:
-            self.tt[key] = TTEntry(key, depth, best_score, flag, best_move)
+        self.tt_keys[tt_index] = key
+        self.tt_moves[tt_index] = best_move
+        self.tt_depth[tt_index] = depth
+        self.tt_score[tt_index] = best_score
+        self.tt_flag[tt_index] = flag
 
         return best_score
 
@@ -707,41 +819,84 @@ class ChessEngine:
             if self.time_exceeded:
                 break
 
-            current_best_move = None
-            current_best_score = -INFINITY
-            alpha = -INFINITY
-            beta = INFINITY
-
-            tt_entry = self.tt.get(board._transposition_key())
-            tt_move = tt_entry.best_move if tt_entry else None
+            # The root position is never stored in the TT, so from depth 2 on the
+            # previous iteration's best move is the root's hash move
+            if current_depth > 1:
+                tt_move = best_move
+            else:
+                key = board._transposition_key()
+                tt_index = hash(key[:-1]) & TT_MASK
+                tt_move = self.tt_moves[tt_index] if self.tt_keys[tt_index] == key else None
             moves = self.order_moves(board, list(board.legal_moves), 0, tt_move)
 
-            for i, move in enumerate(moves):
-                board.push(move)
+            # Aspiration window around the previous iteration's score (not for mate scores)
+            delta = self.ASPIRATION_WINDOW
+            if current_depth > 1 and abs(best_score) < MATE_SCORE - 100:
+                window_alpha = best_score - delta
+                window_beta = best_score + delta
+            else:
+                window_alpha = -INFINITY
+                window_beta = INFINITY
 
-                if i == 0:
-                    score = -self.negamax(board, current_depth - 1, -beta, -alpha, 1)
-                else:
-                    score = -self.negamax(board, current_depth - 1, -alpha - 1, -alpha, 1)
-                    if score > alpha and score < beta:
+            while True:
+                current_best_move = None
+                current_best_score = -INFINITY
+                alpha = window_alpha
+                beta = window_beta
+
+                for i, move in enumerate(moves):
+                    board.push(move)
+
+                    if i == 0:
                         score = -self.negamax(board, current_depth - 1, -beta, -alpha, 1)
+                    else:
+                        score = -self.negamax(board, current_depth - 1, -alpha - 1, -alpha, 1)
+                        if score > alpha and score < beta:
+                            score = -self.negamax(board, current_depth - 1, -beta, -alpha, 1)
 
-                board.pop()
+                    board.pop()
+
+                    if self.time_exceeded:
+                        break
+
+                    if score > current_best_score:
+                        current_best_score = score
+                        current_best_move = move
+
+                    if score > alpha:
+                        alpha = score
+                    if alpha >= beta:
+                        break
 
                 if self.time_exceeded:
                     break
 
-                if score > current_best_score:
-                    current_best_score = score
-                    current_best_move = move
-
-                if score > alpha:
-                    alpha = score
+                # Fail-low or fail-high: widen the window and re-search, with the
+                # move that beat the window first
+                if ((current_best_score <= window_alpha and window_alpha > -INFINITY)
+                        or (current_best_score >= window_beta and window_beta < INFINITY)):
+                    if current_best_score >= window_beta:
+                        moves.remove(current_best_move)
+                        moves.insert(0, current_best_move)
+                    delta *= 2
+                    if delta > self.ASPIRATION_MAX:
+                        window_alpha = -INFINITY
+                        window_beta = INFINITY
+                    else:
+                        window_alpha = best_score - delta
+                        window_beta = best_score + delta
+                    continue
+                break
 
-            if not self.time_exceeded and current_best_move:
+            # A pass cut short by the time limit still searched the previous best
+            # move first, so its best move is kept when that score is exact or a
+            # lower bound; a pass failing low only has upper bounds (<= window_alpha)
+            if current_best_move and (not self.time_exceeded or window_alpha == -INFINITY
+                                      or current_best_score > window_alpha):
                 best_move = current_best_move
                 best_score = current_best_score
-                final_depth = current_depth
+                if not self.time_exceeded:
+                    final_depth = current_depth
 
         return SearchResult(
             best_move=best_move,
@@ -11,12 +11,18 @@ Speed optimizations:
 """
 
 import chess
+import os
+import sys
 import time
+from array import array
 import numpy as np
 from numba import njit
 from typing import Optional
 from dataclasses import dataclass
-from collections import defaultdict
+
+# Add parent directory to path to import the shared engine_base and engine_pst modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine_base import trim_tt
 
 @dataclass
 class SearchResult:
@@ -37,6 +43,13 @@ KING_VALUE = 20000
 INFINITY = 999999
 MATE_SCORE = 100000
 
+# Transposition table entry types: the stored score is exact, a lower bound
+# (failed high, >= beta) or an upper bound (failed low, <= alpha)
+TT_EXACT = 0
+TT_ALPHA = 1
+TT_BETA = 2
+TT_SIZE = 1 << 20
+
 # Piece-square tables as NumPy arrays (FAST lookup)
 PST_PAWN = np.array([
     0,   0,   0,   0,   0,   0,   0,   0,
@@ -104,68 +117,74 @@ PST_KING = np.array([
     20,  30,  10,   0,   0,  10,  30,  20
 ], dtype=np.int32)
 
+def _build_piece_square():
+    """Material + PST per [color, piece_type, square] (color 1 = white, 0 = black,
+    as python-chess's bool colors); black mirrored and negated."""
+    table = np.zeros((2, 7, 64), dtype=np.int32)
+    for piece_type, value, pst in ((chess.PAWN, PAWN_VALUE, PST_PAWN),
+                                   (chess.KNIGHT, KNIGHT_VALUE, PST_KNIGHT),
+                                   (chess.BISHOP, BISHOP_VALUE, PST_BISHOP),
+                                   (chess.ROOK, ROOK_VALUE, PST_ROOK),
+                                   (chess.QUEEN, QUEEN_VALUE, PST_QUEEN),
+                                   (chess.KING, KING_VALUE, PST_KING)):
+        table[1, piece_type] = value + pst
+        # Black reads the PST mirrored vertically (flip rank 0->7, 1->6, ...)
+        table[0, piece_type] = -(value + pst.reshape(8, 8)[::-1].ravel())
+    return table
+
+
+PIECE_SQUARE = _build_piece_square()
+
+# De Bruijn bit scan: the isolated lowest bit times DEBRUIJN, top 6 bits,
+# indexes BITSCAN to give that bit's square
+DEBRUIJN = 0x03F79D71B4CB0A89
+
+
+def _build_bitscan():
+    table = np.zeros(64, dtype=np.int64)
+    for square in range(64):
+        table[(((1 << square) * DEBRUIJN) & 0xFFFFFFFFFFFFFFFF) >> 58] = square
+    return table
+
+
+BITSCAN = _build_bitscan()
+
+
 # JIT-compiled evaluation helper
-@njit(cache=True)
-def eval_position_fast(
-    white_pawns, white_knights, white_bishops, white_rooks, white_queens, white_king,
-    black_pawns, black_knights, black_bishops, black_rooks, black_queens, black_king
-):
-    """Ultra-fast position evaluation using NumPy arrays and Numba JIT.
-
-    Takes piece positions as NumPy arrays of square indices.
-    Returns evaluation score from white's perspective.
+@njit("int64(uint64, uint64, uint64, uint64, uint64, uint64, uint64, uint64)", cache=True)
+def eval_position_fast(pawns, knights, bishops, rooks, queens, kings, white, black):
+    """Ultra-fast position evaluation using Numba JIT.
+
+    Takes python-chess's raw piece and color bitboards, so no per-call
+    arrays are built. Each piece adds its signed PIECE_SQUARE entry, with
+    no branch on color. Returns evaluation score from white's perspective.
     """
     score = 0
-
-    # White pieces
-    for sq in white_pawns:
-        if sq >= 0:  # -1 means no piece
-            score += PAWN_VALUE + PST_PAWN[sq]
-    for sq in white_knights:
-        if sq >= 0:
-            score += KNIGHT_VALUE + PST_KNIGHT[sq]
-    for sq in white_bishops:
-        if sq >= 0:
-            score += BISHOP_VALUE + PST_BISHOP[sq]
-    for sq in white_rooks:
-        if sq >= 0:
-            score += ROOK_VALUE + PST_ROOK[sq]
-    for sq in white_queens:
-        if sq >= 0:
-            score += QUEEN_VALUE + PST_QUEEN[sq]
-    if white_king >= 0:
-        score += KING_VALUE + PST_KING[white_king]
-
-    # Black pieces (mirror PST vertically)
-    for sq in black_pawns:
-        if sq >= 0:
-            mirror_sq = sq ^ 56  # Flip rank (0->7, 1->6, ...)
-            score -= PAWN_VALUE + PST_PAWN[mirror_sq]
-    for sq in black_knights:
-        if sq >= 0:
-            mirror_sq = sq ^ 56
-            score -= KNIGHT_VALUE + PST_KNIGHT[mirror_sq]
-    for sq in black_bishops:
-        if sq >= 0:
-            mirror_sq = sq ^ 56
-            score -= BISHOP_VALUE + PST_BISHOP[mirror_sq]
-    for sq in black_rooks:
-        if sq >= 0:
-            mirror_sq = sq ^ 56
-            score -= ROOK_VALUE + PST_ROOK[mirror_sq]
-    for sq in black_queens:
-        if sq >= 0:
-            mirror_sq = sq ^ 56
-            score -= QUEEN_VALUE + PST_QUEEN[mirror_sq]
-    if black_king >= 0:
-        mirror_sq = black_king ^ 56
-        score -= KING_VALUE + PST_KING[mirror_sq]
-
-    # Bishop pair bonus
-    if len(white_bishops) >= 2:
-        score += 30
-    if len(black_bishops) >= 2:
-        score -= 30
+    for piece_type in range(1, 7):
+        if piece_type == 1:
+            pieces = pawns
+        elif piece_type == 2:
+            pieces = knights
+        elif piece_type == 3:
+            pieces = bishops
+        elif piece_type == 4:
+            pieces = rooks
+        elif piece_type == 5:
+            pieces = queens
+        else:
+            pieces = kings
+        for color in range(2):
+            bb = pieces & (white if color == 1 else black)
+            count = 0
+            while bb:
+                lsb = bb & (~bb + np.uint64(1))
+                score += PIECE_SQUARE[color, piece_type, BITSCAN[(lsb * np.uint64(DEBRUIJN)) >> np.uint64(58)]]
+                bb ^= lsb
+                count += 1
+
+            # Bishop pair bonus
+            if piece_type == 3 and count >= 2:
+                score += 30 if color == 1 else -30
 
     return score
 
@@ -192,15 +211,20 @@ class ChessEngine:
         self.start_time = 0
         self.time_exceeded = False
 
-        # Search tables
+        # Search tables; tt maps board._transposition_key() to
+        # (score, depth, flag, best_move)
         self.tt = {}
-        self.killers = [[None, None] for _ in range(64)]
-        self.history = defaultdict(int)
+        # Two killer moves per ply packed as from | to << 6 | promotion << 12
+        # (0 = none): slots [2 * ply] and [2 * ply + 1]
+        self.killers = array('I', bytes(4 * 2 * 64))
+        # History heuristic: from_square*64 + to_square -> accumulated depth^2
+        # of the quiet moves that caused a beta cutoff
+        self.history = [0] * (64 * 64)
 
     def clear_tables(self):
         self.tt.clear()
-        self.killers = [[None, None] for _ in range(64)]
-        self.history.clear()
+        self.killers = array('I', bytes(4 * 2 * 64))
+        self.history = [0] * (64 * 64)
 
     def search(self, board: chess.Board, depth: int = None) -> SearchResult:
         """Iterative deepening search."""
@@ -210,10 +234,17 @@ class ChessEngine:
         self.nodes_searched = 0
         self.start_time = time.time()
         self.time_exceeded = False
+        # Make room for this search's positions (see trim_tt)
+        trim_tt(self.tt, TT_SIZE)
+        # Age history so earlier searches guide ordering without drowning it
+        self.history = [h >> 1 for h in self.history]
 
         best_move = None
         best_score = -INFINITY
 
+        # Root moves are generated once and reordered by every iteration
+        root_moves = list(board.legal_moves)
+
         # Iterative deepening
         for d in range(1, depth + 1):
             if self.time_exceeded:
@@ -221,22 +252,33 @@ class ChessEngine:
 
             alpha = -INFINITY
             beta = INFINITY
+            iter_best_move = None
 
-            # Search all moves
-            moves = self.order_moves(board, None, 0)
+            # Search all moves, the previous iteration's best move first so the
+            # rest are searched against its score instead of an open window
+            moves = self.order_moves(board, root_moves, best_move, 0)
             for move in moves:
                 board.push(move)
                 score = -self.negamax(board, d - 1, -beta, -alpha, 1)
                 board.pop()
 
-                if score > best_score:
-                    best_score = score
-                    best_move = move
+                if self.time_exceeded:
+                    break
+
+                if score > alpha:
+                    alpha = score
+                    iter_best_move = move
 
                 if self.time_limit and (time.time() - self.start_time) >= self.time_limit:
                     self.time_exceeded = True
                     break
 
+            # A partial iteration still searched the previous best move first,
+            # so whatever it found is at least as good
+            if iter_best_move is not None:
+                best_move = iter_best_move
+                best_score = alpha
+
         time_spent = time.time() - self.start_time
         return SearchResult(
             best_move=best_move,
@@ -246,7 +288,8 @@ class ChessEngine:
             time_spent=time_spent
         )
 
-    def negamax(self, board: chess.Board, depth: int, alpha: int, beta: int, ply: int) -> int:
+    def negamax(self, board: chess.Board, depth: int, alpha: int, beta: int, ply: int,
+                do_null: bool = True) -> int:
         """Alpha-beta search."""
         self.nodes_searched += 1
 
@@ -256,64 +299,133 @@ class ChessEngine:
                 self.time_exceeded = True
                 return 0
 
-        # Terminal conditions
-        if board.is_game_over():
-            if board.is_checkmate():
-                return -MATE_SCORE + ply
-            return 0
-
+        # Terminal conditions. Leaves only need to know whether any move exists;
+        # interior nodes generate their moves once for both the mate/stalemate
+        # test and move ordering instead of again after is_game_over()
         if depth <= 0:
+            if board.is_game_over():
+                if board.is_checkmate():
+                    return -MATE_SCORE + ply
+                return 0
             return self.evaluate(board)
 
+        moves = list(board.legal_moves)
+        if not moves:
+            return -MATE_SCORE + ply if board.is_check() else 0
+        if board.is_insufficient_material() or board.is_seventyfive_moves() or board.is_fivefold_repetition():
+            return 0
+
+        # Transposition table: a deep enough entry answers the node when its bound
+        # settles it for this window; otherwise its best move is searched first
+        key = board._transposition_key()
+        tt_entry = self.tt.get(key)
+        hash_move = None
+        if tt_entry:
+            tt_score, tt_depth, tt_flag, hash_move = tt_entry
+            if tt_depth >= depth:
+                if tt_flag == TT_EXACT:
+                    return tt_score
+                if tt_flag == TT_BETA and tt_score >= beta:
+                    return beta
+                if tt_flag == TT_ALPHA and tt_score <= alpha:
+                    return alpha
+
+        # Null move pruning: if passing still fails high, a real move will too.
+        # Skipped in check, right after another null move and without a piece
+        # besides pawns and king (zugzwang)
+        if do_null and depth >= 3 and not board.is_check() and \
+                (board.knights | board.bishops | board.rooks | board.queens) & board.occupied_co[board.turn]:
+            board.push(chess.Move.null())
+            score = -self.negamax(board, depth - 3, -beta, -beta + 1, ply + 1, False)
+            board.pop()
+            if self.time_exceeded:
+                return 0
+            if score >= beta:
+                return beta
+
         # Move ordering
-        moves = self.order_moves(board, None, ply)
+        moves = self.order_moves(board, moves, hash_move, ply)
 
+        original_alpha = alpha
+        best_move = None
         for move in moves:
             board.push(move)
             score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
             board.pop()
 
+            if self.time_exceeded:
+                return 0
+
             if score >= beta:
-                # Beta cutoff - update killer moves
+                # Beta cutoff - update killer moves and history for quiet moves
                 if not board.is_capture(move):
-                    if self.killers[ply][0] != move:
-                        self.killers[ply][1] = self.killers[ply][0]
-                        self.killers[ply][0] = move
+                    if ply < 64:
+                        killers = self.killers
+                        encoded = move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+                        if killers[2 * ply] != encoded:
+                            killers[2 * ply + 1] = killers[2 * ply]
+                            killers[2 * ply] = encoded
+                    self.history[move.from_square * 64 + move.to_square] += depth * depth
+                self.store_tt(key, beta, depth, TT_BETA, move)
                 return beta
 
             if score > alpha:
                 alpha = score
+                best_move = move
 
+        flag = TT_EXACT if alpha > original_alpha else TT_ALPHA
+        self.store_tt(key, alpha, depth, flag, best_move)
         return alpha
 
-    def order_moves(self, board: chess.Board, hash_move, ply: int) -> list:
-        """MVV-LVA move ordering."""
-        moves = list(board.legal_moves)
+    def store_tt(self, key, score: int, depth: int, flag: int, best_move: Optional[chess.Move]):
+        """Store an entry, keeping the deeper one once the table is full."""
+        tt = self.tt
+        # Popped and re-inserted rather than overwritten, so dict order follows
+        # how recently each key was stored (see trim_tt)
+        old_entry = tt.pop(key, None)
+        if old_entry is None:
+            if len(tt) < TT_SIZE:
+                tt[key] = (score, depth, flag, best_move)
+        elif len(tt) + 1 < TT_SIZE or depth >= old_entry[1]:
+            tt[key] = (score, depth, flag, best_move)
+        else:
+            tt[key] = old_entry
+
+    def order_moves(self, board: chess.Board, moves: list, hash_move, ply: int) -> list:
+        """Order hash move, captures by MVV-LVA, killers, then quiets by history (in place)."""
+        # Bound once per call: captures are found with a bitboard test against
+        # the opponent's pieces instead of board.is_capture() per move (en
+        # passant has no piece on to_square and scores no MVV-LVA bonus, as before)
+        piece_values = self.PIECE_VALUES
+        piece_type_at = board.piece_type_at
+        bb_squares = chess.BB_SQUARES
+        them = board.occupied_co[not board.turn]
+        if ply < 64:
+            killer0 = self.killers[2 * ply]
+            killer1 = self.killers[2 * ply + 1]
+        else:
+            killer0 = killer1 = 0
+        history = self.history
 
         def score_move(move):
-            score = 0
-
-            if move == hash_move:
-                return 1000000
+            if hash_move is not None and move == hash_move:
+                return 10000000
 
             # Captures (MVV-LVA)
-            if board.is_capture(move):
-                victim = board.piece_at(move.to_square)
-                attacker = board.piece_at(move.from_square)
-                if victim and attacker:
-                    score += 10000 + self.PIECE_VALUES[victim.piece_type] - self.PIECE_VALUES[attacker.piece_type]
+            to_square = move.to_square
+            if bb_squares[to_square] & them:
+                return 1000000 + piece_values[piece_type_at(to_square)] - piece_values[piece_type_at(move.from_square)]
 
             # Killer moves
-            if ply < 64:
-                if move == self.killers[ply][0]:
-                    score += 9000
-                elif move == self.killers[ply][1]:
-                    score += 8000
-
-            # History
-            score += self.history.get(move, 0)
+            if killer0:
+                encoded = move.from_square | (to_square << 6) | ((move.promotion or 0) << 12)
+                if encoded == killer0:
+                    return 900000
+                if encoded == killer1:
+                    return 800000
 
-            return score
+            # Quiet moves by history
+            return history[move.from_square * 64 + to_square]
 
         moves.sort(key=score_move, reverse=True)
         return moves
@@ -325,25 +437,11 @@ class ChessEngine:
         if board.is_stalemate():
             return 0
 
-        # Extract piece positions into NumPy arrays for JIT function
-        white_pawns = np.array([sq for sq in board.pieces(chess.PAWN, chess.WHITE)] + [-1] * 8, dtype=np.int32)[:8]
-        white_knights = np.array([sq for sq in board.pieces(chess.KNIGHT, chess.WHITE)] + [-1] * 2, dtype=np.int32)[:2]
-        white_bishops = np.array([sq for sq in board.pieces(chess.BISHOP, chess.WHITE)] + [-1] * 2, dtype=np.int32)[:2]
-        white_rooks = np.array([sq for sq in board.pieces(chess.ROOK, chess.WHITE)] + [-1] * 2, dtype=np.int32)[:2]
-        white_queens = np.array([sq for sq in board.pieces(chess.QUEEN, chess.WHITE)] + [-1] * 1, dtype=np.int32)[:1]
-        white_king = board.king(chess.WHITE) if board.king(chess.WHITE) is not None else -1
-
-        black_pawns = np.array([sq for sq in board.pieces(chess.PAWN, chess.BLACK)] + [-1] * 8, dtype=np.int32)[:8]
-        black_knights = np.array([sq for sq in board.pieces(chess.KNIGHT, chess.BLACK)] + [-1] * 2, dtype=np.int32)[:2]
-        black_bishops = np.array([sq for sq in board.pieces(chess.BISHOP, chess.BLACK)] + [-1] * 2, dtype=np.int32)[:2]
-        black_rooks = np.array([sq for sq in board.pieces(chess.ROOK, chess.BLACK)] + [-1] * 2, dtype=np.int32)[:2]
-        black_queens = np.array([sq for sq in board.pieces(chess.QUEEN, chess.BLACK)] + [-1] * 1, dtype=np.int32)[:1]
-        black_king = board.king(chess.BLACK) if board.king(chess.BLACK) is not None else -1
-
-        # Call JIT-compiled evaluation function
+        # Call JIT-compiled evaluation function on the raw bitboards
+        occupied_co = board.occupied_co
         score = eval_position_fast(
-            white_pawns, white_knights, white_bishops, white_rooks, white_queens, white_king,
-            black_pawns, black_knights, black_bishops, black_rooks, black_queens, black_king
+            board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings,
+            occupied_co[chess.WHITE], occupied_co[chess.BLACK]
         )
 
         # Add non-JIT features for strength (v5 level)
@@ -455,16 +553,16 @@ class ChessEngine:
         return score
 
     def evaluate_mobility(self, board: chess.Board) -> int:
-        """Evaluate piece mobility."""
-        if board.turn == chess.WHITE:
-            white_mob = len(list(board.legal_moves))
-            board.push(chess.Move.null())
-            black_mob = len(list(board.legal_moves))
-            board.pop()
-            return (white_mob - black_mob) * 2
-        else:
-            black_mob = len(list(board.legal_moves))
-            board.push(chess.Move.null())
-            white_mob = len(list(board.legal_moves))
-            board.pop()
-            return (black_mob - white_mob) * 2
+        """
+        Evaluate piece mobility as the squares attacked by knights, bishops,
+        rooks and queens that are not blocked by own pieces. A pseudo-legal
+        proxy: no null move and no legal move generation per leaf.
+        """
+        score = 0
+        pieces = board.knights | board.bishops | board.rooks | board.queens
+        for color in [chess.WHITE, chess.BLACK]:
+            sign = 1 if color == chess.WHITE else -1
+            own = board.occupied_co[color]
+            for sq in chess.scan_forward(pieces & own):
+                score += sign * chess.popcount(board.attacks_mask(sq) & ~own) * 2
+        return score
@@ -8,10 +8,17 @@ Improvements over v3.0:
 """
 
 import chess
+import os
+import sys
 import time
 from typing import Optional
 from dataclasses import dataclass
-from collections import defaultdict
+from array import array
+
+# Add parent directory to path to import the shared engine_base and engine_pst modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine_base import encode_move, trim_tt
+from engine_pst import build_pst_flat
 
 
 @dataclass
@@ -174,13 +181,24 @@ class ChessEngine:
         -50,-30,-20,-10,-10,-20,-30,-50,
     ]
 
+    # Tables indexed by piece type. Pawns and kings have None in PST_BY_TYPE
+    # and interpolate their (middlegame, endgame) pair by phase instead
+    PST_BY_TYPE = (None, None, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, None)
+    PST_BLENDED_BY_TYPE = (None, (PAWN_TABLE_MG, PAWN_TABLE_EG), None, None, None, None,
+                           (KING_TABLE_MG, KING_TABLE_EG))
+    # Both flattened per phase step, see engine_pst.build_pst_flat()
+    PST_FLAT = build_pst_flat(PST_BY_TYPE, PST_BLENDED_BY_TYPE)
+
     # Passed pawn bonus by rank
     PASSED_PAWN_BONUS = [0, 15, 25, 40, 60, 90, 130, 0]
 
     # Constants
     INFINITY = 999999
     MATE_SCORE = 100000
+    EVAL_CACHE_SIZE = 1 << 16  # Cached static evaluations before the cache is cleared
     TT_SIZE = 1 << 20
+    ASPIRATION_WINDOW = 100  # Initial half-width around the previous iteration's score
+    ASPIRATION_MAX = 400    # Beyond this, fall back to a full window
 
     def __init__(self, max_depth: int = 6, time_limit: float = None):
         self.max_depth = max_depth
@@ -189,49 +207,32 @@ class ChessEngine:
         self.start_time = 0
         self.time_exceeded = False
         self.tt = {}
-        self.killers = [[None, None] for _ in range(64)]
-        self.history = defaultdict(int)
+        # Two packed killer moves per ply (see encode_move): slots [2 * ply] and [2 * ply + 1]
+        self.killers = array('I', bytes(4 * 2 * 64))
+        self.history = array('q', bytes(8 * 64 * 64))  # Indexed by from_square * 64 + to_square
+        self.eval_cache = {}  # Static evaluations by board._transposition_key()
+
+        # MVV-LVA capture scores, indexed by victim_type * 8 + attacker_type
+        self.mvv_lva = [0] * 64
+        for victim in chess.PIECE_TYPES:
+            for attacker in chess.PIECE_TYPES:
+                self.mvv_lva[victim * 8 + attacker] = self.PIECE_VALUES[victim] * 10 - self.PIECE_VALUES[attacker]
 
     def clear_tables(self):
         self.tt.clear()
-        self.killers = [[None, None] for _ in range(64)]
-        self.history.clear()
+        self.killers = array('I', bytes(4 * 2 * 64))
+        self.history = array('q', bytes(8 * 64 * 64))
+        self.eval_cache.clear()
+
+    def get_phase_step(self, board: chess.Board) -> int:
+        """Phase material (N/B = 1, R = 2, Q = 4) clamped to 24"""
+        return min(chess.popcount(board.knights | board.bishops)
+                   + 2 * chess.popcount(board.rooks)
+                   + 4 * chess.popcount(board.queens), 24)
 
     def get_game_phase(self, board: chess.Board) -> float:
         """0.0 = opening/middlegame, 1.0 = endgame"""
-        phase = 0
-        phase += len(board.pieces(chess.KNIGHT, chess.WHITE)) * 1
-        phase += len(board.pieces(chess.KNIGHT, chess.BLACK)) * 1
-        phase += len(board.pieces(chess.BISHOP, chess.WHITE)) * 1
-        phase += len(board.pieces(chess.BISHOP, chess.BLACK)) * 1
-        phase += len(board.pieces(chess.ROOK, chess.WHITE)) * 2
-        phase += len(board.pieces(chess.ROOK, chess.BLACK)) * 2
-        phase += len(board.pieces(chess.QUEEN, chess.WHITE)) * 4
-        phase += len(board.pieces(chess.QUEEN, chess.BLACK)) * 4
-        return 1.0 - min(phase / 24.0, 1.0)
-
-    def get_pst_value(self, piece: chess.Piece, square: int, phase: float) -> int:
-        """Get piece-square table value with phase interpolation."""
-        sq = square if piece.color == chess.WHITE else chess.square_mirror(square)
-        pt = piece.piece_type
-
-        if pt == chess.PAWN:
-            mg = self.PAWN_TABLE_MG[sq]
-            eg = self.PAWN_TABLE_EG[sq]
-            return int(mg * (1 - phase) + eg * phase)
-        elif pt == chess.KNIGHT:
-            return self.KNIGHT_TABLE[sq]
-        elif pt == chess.BISHOP:
-            return self.BISHOP_TABLE[sq]
-        elif pt == chess.ROOK:
-            return self.ROOK_TABLE[sq]
-        elif pt == chess.QUEEN:
-            return self.QUEEN_TABLE[sq]
-        elif pt == chess.KING:
-            mg = self.KING_TABLE_MG[sq]
-            eg = self.KING_TABLE_EG[sq]
-            return int(mg * (1 - phase) + eg * phase)
-        return 0
+        return 1.0 - self.get_phase_step(board) / 24.0
 
     def evaluate_development(self, board: chess.Board, phase: float) -> int:
         """Evaluate piece development (important in opening/early middlegame)."""
@@ -358,8 +359,7 @@ class ChessEngine:
             for pt in [chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]:
                 for sq in board.pieces(pt, color):
                     # Count squares this piece attacks
-                    attacks = board.attacks(sq)
-                    mobility = bin(attacks).count('1')
+                    mobility = chess.popcount(board.attacks_mask(sq))
                     score += sign * mobility * self.MOBILITY_BONUS[pt]
 
         return score
@@ -523,7 +523,7 @@ class ChessEngine:
             sign = 1 if color == chess.WHITE else -1
 
             # Bishop pair
-            if len(board.pieces(chess.BISHOP, color)) >= 2:
+            if chess.popcount(board.bishops & board.occupied_co[color]) >= 2:
                 score += sign * 45
 
             # Bad bishop (blocked by own pawns)
@@ -621,7 +621,7 @@ class ChessEngine:
                     elif attackers:
                         # Attacked by lesser piece?
                         min_attacker_value = min(
-                            self.PIECE_VALUES[board.piece_at(att_sq).piece_type]
+                            self.PIECE_VALUES[board.piece_type_at(att_sq)]
                             for att_sq in attackers
                         )
                         if min_attacker_value < self.PIECE_VALUES[pt]:
@@ -630,29 +630,49 @@ class ChessEngine:
         return score
 
     def evaluate(self, board: chess.Board) -> int:
-        """Full position evaluation."""
+        """
+        Full position evaluation. The static part is cached by transposition
+        key; the fifty-move and repetition draws depend on the move history,
+        so they are checked on every call (mate still takes precedence).
+        """
+        key = board._transposition_key()
+        score = self.eval_cache.get(key)
+        if score is None:
+            if len(self.eval_cache) >= self.EVAL_CACHE_SIZE:
+                self.eval_cache.clear()
+            score = self.eval_cache[key] = self.evaluate_static(board)
+
+        if score != -self.MATE_SCORE and (board.is_fifty_moves() or board.is_repetition(2)):
+            return 0
+
+        return score
+
+    def evaluate_static(self, board: chess.Board) -> int:
+        """Evaluation of the position alone (no history-dependent draws)."""
         if board.is_checkmate():
             return -self.MATE_SCORE
 
         if board.is_stalemate() or board.is_insufficient_material():
             return 0
 
-        if board.is_fifty_moves() or board.is_repetition(2):
-            return 0
-
-        phase = self.get_game_phase(board)
+        step = self.get_phase_step(board)
+        phase = 1.0 - step / 24.0
         score = 0
 
-        # Material and piece-square tables
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece:
-                value = self.PIECE_VALUES[piece.piece_type]
-                value += self.get_pst_value(piece, square, phase)
-                if piece.color == chess.WHITE:
-                    score += value
-                else:
-                    score -= value
+        # Material and piece-square tables: walk each piece bitboard once and
+        # read the flat PST block for this phase step
+        piece_values = self.PIECE_VALUES
+        pst = self.PST_FLAT
+        white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+        for pt, pieces in zip(chess.PIECE_TYPES, (board.pawns, board.knights, board.bishops,
+                                                   board.rooks, board.queens, board.kings)):
+            value = piece_values[pt]
+            # Black's block comes first, White's (color == 1) 64 entries later
+            base = (step * 12 + (pt - 1) * 2) * 64
+            for square in chess.scan_forward(pieces & white):
+                score += value + pst[base + 64 + square]
+            for square in chess.scan_forward(pieces & black):
+                score -= value + pst[base + square]
 
         # Positional evaluation
         score += self.evaluate_development(board, phase)
@@ -672,45 +692,87 @@ class ChessEngine:
 
         return score
 
-    def score_move(self, board: chess.Board, move: chess.Move, ply: int, tt_move: chess.Move = None) -> int:
-        """Score move for ordering."""
-        score = 0
-
-        if tt_move and move == tt_move:
-            return 10000000
-
-        if board.is_capture(move):
-            victim = board.piece_at(move.to_square)
-            attacker = board.piece_at(move.from_square)
+    def order_moves(self, board: chess.Board, moves: list, ply: int, tt_move: chess.Move = None) -> list:
+        """
+        Order moves: hash move, captures by MVV-LVA (en passant as a pawn
+        capture), promotions, this ply's two killers, then history. The tables
+        and killers are bound once per node instead of looked up for every
+        move. Sorted in place (stable, best first).
+        """
+        piece_type_at = board.piece_type_at
+        mvv_lva = self.mvv_lva
+        piece_values = self.PIECE_VALUES
+        history = self.history
+        ep_square = board.ep_square
+        pawns = board.pawns
+        bb_squares = chess.BB_SQUARES
+        if ply < 64:
+            killer1 = self.killers[2 * ply]
+            killer2 = self.killers[2 * ply + 1]
+        else:
+            killer1 = killer2 = -1  # Never an encoded move
+
+        def score_move(move):
+            if tt_move and move == tt_move:
+                return 10000000
+
+            from_square = move.from_square
+            to_square = move.to_square
+            victim = piece_type_at(to_square)
             if victim:
-                score += 1000000 + self.PIECE_VALUES[victim.piece_type] * 10 - self.PIECE_VALUES[attacker.piece_type]
+                score = 1000000 + mvv_lva[victim * 8 + piece_type_at(from_square)]
+            elif to_square == ep_square and pawns & bb_squares[from_square]:
+                score = 1000000 + 100
             else:
-                score += 1000000 + 100
+                score = 0
 
-        if move.promotion:
-            score += 900000 + self.PIECE_VALUES[move.promotion]
+            if move.promotion:
+                score += 900000 + piece_values[move.promotion]
 
-        if ply < 64:
-            if move == self.killers[ply][0]:
+            enc = encode_move(move)
+            if enc == killer1:
                 score += 800000
-            elif move == self.killers[ply][1]:
+            elif enc == killer2:
                 score += 700000
 
-        score += self.history[(move.from_square, move.to_square)]
+            return score + history[from_square * 64 + to_square]
 
-        return score
+        moves.sort(key=score_move, reverse=True)
+        return moves
 
-    def order_moves(self, board: chess.Board, moves: list, ply: int, tt_move: chess.Move = None) -> list:
-        scored = [(self.score_move(board, m, ply, tt_move), m) for m in moves]
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [m for _, m in scored]
+    def order_captures(self, board: chess.Board, moves: list) -> list:
+        """
+        Order quiescence moves (captures and quiet promotions) by MVV-LVA
+        alone: the hash move, killer and history terms of order_moves() only
+        separate quiet moves. Sorted in place, best first.
+        """
+        piece_type_at = board.piece_type_at
+        mvv_lva = self.mvv_lva
+        piece_values = self.PIECE_VALUES
+
+        def score_capture(move):
+            victim = piece_type_at(move.to_square)
+            if victim:
+                score = 1000000 + mvv_lva[victim * 8 + piece_type_at(move.from_square)]
+            elif move.promotion:
+                score = 0
+            else:
+                score = 1000000 + 100  # En passant
+            if move.promotion:
+                score += 900000 + piece_values[move.promotion]
+            return score
+
+        moves.sort(key=score_capture, reverse=True)
+        return moves
 
     def store_killer(self, move: chess.Move, ply: int):
         if ply >= 64:
             return
-        if move != self.killers[ply][0]:
-            self.killers[ply][1] = self.killers[ply][0]
-            self.killers[ply][0] = move
+        enc = encode_move(move)
+        idx = 2 * ply
+        if enc != self.killers[idx]:
+            self.killers[idx + 1] = self.killers[idx]
+            self.killers[idx] = enc
 
     def quiescence(self, board: chess.Board, alpha: int, beta: int, ply: int) -> int:
         self.nodes_searched += 1
@@ -730,17 +792,24 @@ class ChessEngine:
         if stand_pat > alpha:
             alpha = stand_pat
 
-        captures = [m for m in board.legal_moves if board.is_capture(m) or m.promotion]
-        captures = self.order_moves(board, captures, ply)
+        # Only captures and promotions, generated directly rather than filtering
+        # every legal move (quiet promotions are pawn pushes to an empty back rank)
+        captures = list(board.generate_legal_captures())
+        captures.extend(board.generate_legal_moves(board.pawns, chess.BB_BACKRANKS & ~board.occupied))
+        captures = self.order_captures(board, captures)
+
+        piece_type_at = board.piece_type_at
+        piece_values = self.PIECE_VALUES
+        quiescence = self.quiescence
 
         for move in captures:
             if not move.promotion:
-                victim = board.piece_at(move.to_square)
-                if victim and stand_pat + self.PIECE_VALUES[victim.piece_type] + 200 < alpha:
+                victim = piece_type_at(move.to_square)
+                if victim and stand_pat + piece_values[victim] + 200 < alpha:
                     continue
 
             board.push(move)
-            score = -self.quiescence(board, -beta, -alpha, ply + 1)
+            score = -quiescence(board, -beta, -alpha, ply + 1)
             board.pop()
 
             if self.time_exceeded:
@@ -787,9 +856,10 @@ class ChessEngine:
 
         in_check = board.is_check()
 
-        # Null move pruning
-        if do_null and depth >= 3 and not in_check and self.get_game_phase(board) < 0.8:
-            has_pieces = any(board.pieces(pt, board.turn) for pt in [chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN])
+        # Null move pruning (phase material >= 5 is get_game_phase() < 0.8, as an int)
+        if do_null and depth >= 3 and not in_check and self.get_phase_step(board) >= 5:
+            # Zugzwang guard: side to move must have a non-pawn piece
+            has_pieces = (board.knights | board.bishops | board.rooks | board.queens) & board.occupied_co[board.turn]
             if has_pieces:
                 board.push(chess.Move.null())
                 R = 3 if depth >= 6 else 2
@@ -810,21 +880,35 @@ class ChessEngine:
         best_score = -self.INFINITY
         flag = TT_ALPHA
 
+        # Bound once per node: each move's capture flag is a bitboard test taken
+        # before the push (afterwards the mover stands on to_square and
+        # board.is_capture() is always true) and reused by LMR and the
+        # history/killer updates (a pawn moving to the ep square captures en passant)
+        them = board.occupied_co[not board.turn]
+        pawns = board.pawns
+        ep_square = board.ep_square
+        bb_squares = chess.BB_SQUARES
+        negamax = self.negamax
+        history = self.history
+
         for i, move in enumerate(moves):
+            to_square = move.to_square
+            is_capture = bool(them & bb_squares[to_square]) or (
+                to_square == ep_square and bool(pawns & bb_squares[move.from_square]))
             board.push(move)
 
-            # LMR
-            if i >= 4 and depth >= 3 and not in_check and not board.is_check() and not board.is_capture(move) and not move.promotion:
-                score = -self.negamax(board, depth - 2, -alpha - 1, -alpha, ply + 1)
+            # LMR (cheap flags first so board.is_check() only runs for reducible moves)
+            if i >= 4 and depth >= 3 and not in_check and not is_capture and not move.promotion and not board.is_check():
+                score = -negamax(board, depth - 2, -alpha - 1, -alpha, ply + 1)
                 if score > alpha:
-                    score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                    score = -negamax(board, depth - 1, -beta, -alpha, ply + 1)
             else:
                 if i == 0:
-                    score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                    score = -negamax(board, depth - 1, -beta, -alpha, ply + 1)
                 else:
-                    score = -self.negamax(board, depth - 1, -alpha - 1, -alpha, ply + 1)
+                    score = -negamax(board, depth - 1, -alpha - 1, -alpha, ply + 1)
                     if score > alpha and score < beta:
-                        score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                        score = -negamax(board, depth - 1, -beta, -alpha, ply + 1)
 
             board.pop()
 
@@ -838,19 +922,26 @@ class ChessEngine:
             if score > alpha:
                 alpha = score
                 flag = TT_EXACT
-                if not board.is_capture(move):
-                    self.history[(move.from_square, move.to_square)] += depth * depth
+                if not is_capture:
+                    history[move.from_square * 64 + move.to_square] += depth * depth
 
             if alpha >= beta:
-                if not board.is_capture(move):
+                if not is_capture:
                     self.store_killer(move, ply)
                 flag = TT_BETA
                 break
 
-        if len(self.tt) < self.TT_SIZE:
-            self.tt[key] = TTEntry(key, depth, best_score, flag, best_move)
-        elif key in self.tt and depth >= self.tt[key].depth:
-            self.tt[key] = TTEntry(key, depth, best_score, flag, best_move)
+        # Popped and re-inserted rather than overwritten, so dict order follows
+        # how recently each key was stored (see trim_tt)
+        tt = self.tt
+        old_entry = tt.pop(key, None)
+        if old_entry is None:
+            if len(tt) < self.TT_SIZE:
+                tt[key] = TTEntry(key, depth, best_score, flag, best_move)
+        elif len(tt) + 1 < self.TT_SIZE or depth >= old_entry.depth:
+            tt[key] = TTEntry(key, depth, best_score, flag, best_move)
+        else:
+            tt[key] = old_entry
 
         return best_score
 
@@ -861,6 +952,8 @@ class ChessEngine:
         self.nodes_searched = 0
         self.start_time = time.time()
         self.time_exceeded = False
+        # Make room for this search's positions (see trim_tt)
+        trim_tt(self.tt, self.TT_SIZE)
 
         moves = list(board.legal_moves)
         if not moves:
@@ -874,41 +967,83 @@ class ChessEngine:
             if self.time_exceeded:
                 break
 
-            current_best_move = None
-            current_best_score = -self.INFINITY
-            alpha = -self.INFINITY
-            beta = self.INFINITY
-
-            tt_entry = self.tt.get(board._transposition_key())
-            tt_move = tt_entry.best_move if tt_entry else None
+            # The root position is never stored in the TT, so from depth 2 on the
+            # previous iteration's best move is the root's hash move
+            if current_depth > 1:
+                tt_move = best_move
+            else:
+                tt_entry = self.tt.get(board._transposition_key())
+                tt_move = tt_entry.best_move if tt_entry else None
             moves = self.order_moves(board, list(board.legal_moves), 0, tt_move)
 
-            for i, move in enumerate(moves):
-                board.push(move)
+            # Aspiration window around the previous iteration's score (not for mate scores)
+            delta = self.ASPIRATION_WINDOW
+            if current_depth > 1 and abs(best_score) < self.MATE_SCORE - 100:
+                window_alpha = best_score - delta
+                window_beta = best_score + delta
+            else:
+                window_alpha = -self.INFINITY
+                window_beta = self.INFINITY
 
-                if i == 0:
-                    score = -self.negamax(board, current_depth - 1, -beta, -alpha, 1)
-                else:
-                    score = -self.negamax(board, current_depth - 1, -alpha - 1, -alpha, 1)
-                    if score > alpha and score < beta:
+            while True:
+                current_best_move = None
+                current_best_score = -self.INFINITY
+                alpha = window_alpha
+                beta = window_beta
+
+                for i, move in enumerate(moves):
+                    board.push(move)
+
+                    if i == 0:
                         score = -self.negamax(board, current_depth - 1, -beta, -alpha, 1)
+                    else:
+                        score = -self.negamax(board, current_depth - 1, -alpha - 1, -alpha, 1)
+                        if score > alpha and score < beta:
+                            score = -self.negamax(board, current_depth - 1, -beta, -alpha, 1)
 
-                board.pop()
+                    board.pop()
+
+                    if self.time_exceeded:
+                        break
+
+                    if score > current_best_score:
+                        current_best_score = score
+                        current_best_move = move
+
+                    if score > alpha:
+                        alpha = score
+                    if alpha >= beta:
+                        break
 
                 if self.time_exceeded:
                     break
 
-                if score > current_best_score:
-                    current_best_score = score
-                    current_best_move = move
-
-                if score > alpha:
-                    alpha = score
+                # Fail-low or fail-high: widen the window and re-search, with the
+                # move that beat the window first
+                if ((current_best_score <= window_alpha and window_alpha > -self.INFINITY)
+                        or (current_best_score >= window_beta and window_beta < self.INFINITY)):
+                    if current_best_score >= window_beta:
+                        moves.remove(current_best_move)
+                        moves.insert(0, current_best_move)
+                    delta *= 2
+                    if delta > self.ASPIRATION_MAX:
+                        window_alpha = -self.INFINITY
+                        window_beta = self.INFINITY
+                    else:
+                        window_alpha = best_score - delta
+                        window_beta = best_score + delta
+                    continue
+                break
 
-            if not self.time_exceeded and current_best_move:
+            # A pass cut short by the time limit still searched the previous best
+            # move first, so its best move is kept when that score is exact or a
+            # lower bound; a pass failing low only has upper bounds (<= window_alpha)
+            if current_best_move and (not self.time_exceeded or window_alpha == -self.INFINITY
+                                      or current_best_score > window_alpha):
                 best_move = current_best_move
                 best_score = current_best_score
-                final_depth = current_depth
+                if not self.time_exceeded:
+                    final_depth = current_depth
 
         return SearchResult(
             best_move=best_move,
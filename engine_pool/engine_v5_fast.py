@@ -6,12 +6,18 @@ Same evaluation and search as V5, just faster execution.
 """
 
 import chess
+import os
+import sys
 import time
 import numpy as np
 from numba import njit
-from typing import Optional
+from array import array
 from dataclasses import dataclass
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+# Add parent directory to path to import the shared engine_base and engine_pst modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine_base import encode_move, trim_tt
 
 
 @dataclass
@@ -37,76 +43,89 @@ class TTEntry:
     depth: int
     score: int
     flag: int
-    best_move: Optional[chess.Move]
+    best_move: int  # Packed with encode_move(), 0 = no move
+
+
+# De Bruijn sequence for branch-free least-significant-bit lookup
+DEBRUIJN64 = np.uint64(0x03F79D71B4CB0A89)
+DEBRUIJN_INDEX = np.array([
+     0,  1, 48,  2, 57, 49, 28,  3,
+    61, 58, 50, 42, 38, 29, 17,  4,
+    62, 55, 59, 36, 53, 51, 43, 22,
+    45, 39, 33, 30, 24, 18, 12,  5,
+    63, 47, 56, 27, 60, 41, 37, 16,
+    54, 35, 52, 21, 44, 32, 23, 11,
+    46, 26, 40, 15, 34, 20, 31, 10,
+    25, 14, 19,  9, 13,  8,  7,  6,
+], dtype=np.int64)
+
+# Material values indexed by piece index % 6 (pawn..king)
+MATERIAL_NP = np.array([100, 305, 333, 500, 900, 20000], dtype=np.int32)
+
+
+@njit(cache=True)
+def _lsb(bb):
+    """Index of the least significant set bit of a non-zero uint64."""
+    isolated = bb & (~bb + np.uint64(1))
+    return DEBRUIJN_INDEX[(isolated * DEBRUIJN64) >> np.uint64(58)]
 
 
 # JIT-compiled fast material counter
 @njit(cache=True)
-def count_material_fast(
-    white_pawns, white_knights, white_bishops, white_rooks, white_queens, white_king,
-    black_pawns, black_knights, black_bishops, black_rooks, black_queens, black_king,
-    pawn_table, knight_table, bishop_table, rook_table, queen_table, king_table
-):
-    """Fast material + PST calculation using Numba JIT."""
-    score = 0
+def count_material_fast(bbs, pst_flat):
+    """
+    Fast material + PST calculation using Numba JIT.
 
-    # White pieces
-    for sq in white_pawns:
-        if sq >= 0:
-            score += 100 + pawn_table[sq]
-    for sq in white_knights:
-        if sq >= 0:
-            score += 305 + knight_table[sq]
-    for sq in white_bishops:
-        if sq >= 0:
-            score += 333 + bishop_table[sq]
-    for sq in white_rooks:
-        if sq >= 0:
-            score += 500 + rook_table[sq]
-    for sq in white_queens:
-        if sq >= 0:
-            score += 900 + queen_table[sq]
-    if white_king >= 0:
-        score += 20000 + king_table[white_king]
-
-    # Black pieces (mirror PST vertically)
-    for sq in black_pawns:
-        if sq >= 0:
-            mirror_sq = sq ^ 56  # XOR with 56 flips rank
-            score -= 100 + pawn_table[mirror_sq]
-    for sq in black_knights:
-        if sq >= 0:
-            mirror_sq = sq ^ 56
-            score -= 305 + knight_table[mirror_sq]
-    for sq in black_bishops:
-        if sq >= 0:
-            mirror_sq = sq ^ 56
-            score -= 333 + bishop_table[mirror_sq]
-    for sq in black_rooks:
-        if sq >= 0:
-            mirror_sq = sq ^ 56
-            score -= 500 + rook_table[mirror_sq]
-    for sq in black_queens:
-        if sq >= 0:
-            mirror_sq = sq ^ 56
-            score -= 900 + queen_table[mirror_sq]
-    if black_king >= 0:
-        mirror_sq = black_king ^ 56
-        score -= 20000 + king_table[mirror_sq]
+    bbs holds 12 uint64 bitboards (white P,N,B,R,Q,K then black P,N,B,R,Q,K)
+    and pst_flat the matching int16[12, 64] piece-square tables. Black rows
+    are stored pre-mirrored, so every piece indexes its table by raw square.
+    """
+    score = 0
+    for piece_idx in range(6):
+        bb = bbs[piece_idx]
+        value = MATERIAL_NP[piece_idx]
+        while bb:
+            sq = _lsb(bb)
+            score += value + pst_flat[piece_idx, sq]
+            bb &= bb - np.uint64(1)
+    for piece_idx in range(6, 12):
+        bb = bbs[piece_idx]
+        value = MATERIAL_NP[piece_idx - 6]
+        while bb:
+            sq = _lsb(bb)
+            score -= value + pst_flat[piece_idx, sq]
+            bb &= bb - np.uint64(1)
 
     return score
 
 
-# NumPy PST arrays for JIT (initialized from class tables later)
+# Flattened int16[12, 64] PST arrays for JIT (one per game stage).
+# Rows 6-11 are the black tables, mirrored vertically (sq ^ 56) up front.
 # These will be set in __init__ from the class-level PST tables
-PST_PAWN_MG_NP = None
-PST_PAWN_EG_NP = None
-PST_KNIGHT_NP = None
-PST_BISHOP_NP = None
-PST_ROOK_NP = None
-PST_QUEEN_NP = None
-PST_KING_MG_NP = None
-PST_KING_EG_NP = None
+PST_FLAT_MG_NP = None
+PST_FLAT_EG_NP = None
+
+
+# Per-process engine used by root-split worker processes
+_WORKER_ENGINE = None
+
+
+def _init_worker(max_depth: int, time_limit: float):
+    """Create the engine instance owned by a worker process."""
+    global _WORKER_ENGINE
+    _WORKER_ENGINE = ChessEngine(max_depth=max_depth, time_limit=time_limit)
+
+
+def _search_root_move(board: chess.Board, move: chess.Move, depth: int, alpha: int, beta: int, start_time: float):
+    """Search one root move in a worker process. Returns (score, nodes, time_exceeded)."""
+    engine = _WORKER_ENGINE
+    engine.nodes_searched = 0
+    engine.start_time = start_time
+    engine.time_exceeded = False
+    trim_tt(engine.tt, engine.TT_SIZE)
+    board.push(move)
+    score = -engine.negamax(board, depth - 1, -beta, -alpha, 1)
+    return score, engine.nodes_searched, engine.time_exceeded
 
 
 class ChessEngine:
@@ -249,48 +268,72 @@ class ChessEngine:
     # Constants
     INFINITY = 999999
     MATE_SCORE = 100000
+    EVAL_CACHE_SIZE = 1 << 16  # Cached static evaluations before the cache is cleared
     TT_SIZE = 1 << 20
+    MAX_PLY = 64
+    PARALLEL_MIN_DEPTH = 4  # Below this, process dispatch costs more than it saves
+    ASPIRATION_WINDOW = 100  # Initial half-width around the previous iteration's score
+    ASPIRATION_MAX = 400    # Beyond this, fall back to a full window
 
-    def __init__(self, max_depth: int = 6, time_limit: float = None):
+    def __init__(self, max_depth: int = 6, time_limit: float = None, workers: int = 1):
         self.max_depth = max_depth
         self.time_limit = time_limit
+        self.workers = workers
+        self.pool = None
         self.nodes_searched = 0
         self.start_time = 0
         self.time_exceeded = False
         self.tt = {}
-        self.killers = [[None, None] for _ in range(64)]
-        self.history = defaultdict(int)
-
-        # Initialize NumPy PST arrays for JIT (only once)
-        global PST_PAWN_MG_NP, PST_PAWN_EG_NP, PST_KNIGHT_NP, PST_BISHOP_NP
-        global PST_ROOK_NP, PST_QUEEN_NP, PST_KING_MG_NP, PST_KING_EG_NP
-        if PST_PAWN_MG_NP is None:
-            PST_PAWN_MG_NP = np.array(self.PAWN_TABLE_MG, dtype=np.int32)
-            PST_PAWN_EG_NP = np.array(self.PAWN_TABLE_EG, dtype=np.int32)
-            PST_KNIGHT_NP = np.array(self.KNIGHT_TABLE, dtype=np.int32)
-            PST_BISHOP_NP = np.array(self.BISHOP_TABLE, dtype=np.int32)
-            PST_ROOK_NP = np.array(self.ROOK_TABLE, dtype=np.int32)
-            PST_QUEEN_NP = np.array(self.QUEEN_TABLE, dtype=np.int32)
-            PST_KING_MG_NP = np.array(self.KING_TABLE_MG, dtype=np.int32)
-            PST_KING_EG_NP = np.array(self.KING_TABLE_EG, dtype=np.int32)
+        # Two packed killer moves per ply: slots [2 * ply] and [2 * ply + 1]
+        self.killers = array('I', [0] * (2 * self.MAX_PLY))
+        self.history = array('q', bytes(8 * 64 * 64))  # Indexed by from_square * 64 + to_square
+        self.eval_cache = {}  # Static evaluations by board._transposition_key()
+
+        # MVV-LVA capture scores, indexed by victim_type * 8 + attacker_type
+        self.mvv_lva = [0] * 64
+        for victim in chess.PIECE_TYPES:
+            for attacker in chess.PIECE_TYPES:
+                self.mvv_lva[victim * 8 + attacker] = self.PIECE_VALUES[victim] * 10 - self.PIECE_VALUES[attacker]
+
+        # Bitboard buffer handed to the JIT evaluator (allocated once, reused)
+        self.bitboards = np.zeros(12, dtype=np.uint64)
+
+        # Initialize flattened NumPy PST arrays for JIT (only once)
+        global PST_FLAT_MG_NP, PST_FLAT_EG_NP
+        if PST_FLAT_MG_NP is None:
+            mg = [self.PAWN_TABLE_MG, self.KNIGHT_TABLE, self.BISHOP_TABLE,
+                  self.ROOK_TABLE, self.QUEEN_TABLE, self.KING_TABLE_MG]
+            eg = [self.PAWN_TABLE_EG, self.KNIGHT_TABLE, self.BISHOP_TABLE,
+                  self.ROOK_TABLE, self.QUEEN_TABLE, self.KING_TABLE_EG]
+            mg_black = [[table[sq ^ 56] for sq in range(64)] for table in mg]
+            eg_black = [[table[sq ^ 56] for sq in range(64)] for table in eg]
+            PST_FLAT_MG_NP = np.array(mg + mg_black, dtype=np.int16)
+            PST_FLAT_EG_NP = np.array(eg + eg_black, dtype=np.int16)
 
     def clear_tables(self):
         self.tt.clear()
-        self.killers = [[None, None] for _ in range(64)]
-        self.history.clear()
+        self.killers = array('I', [0] * (2 * self.MAX_PLY))
+        self.history = array('q', bytes(8 * 64 * 64))
+        self.eval_cache.clear()
+
+    def close(self):
+        """Shut down the root-split worker processes, if any were started."""
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    def __del__(self):
+        self.close()
+
+    def get_phase_step(self, board: chess.Board) -> int:
+        """Phase material (N/B = 1, R = 2, Q = 4) clamped to 24"""
+        return min(chess.popcount(board.knights | board.bishops)
+                   + 2 * chess.popcount(board.rooks)
+                   + 4 * chess.popcount(board.queens), 24)
 
     def get_game_phase(self, board: chess.Board) -> float:
         """0.0 = opening/middlegame, 1.0 = endgame"""
-        phase = 0
-        phase += len(board.pieces(chess.KNIGHT, chess.WHITE)) * 1
-        phase += len(board.pieces(chess.KNIGHT, chess.BLACK)) * 1
-        phase += len(board.pieces(chess.BISHOP, chess.WHITE)) * 1
-        phase += len(board.pieces(chess.BISHOP, chess.BLACK)) * 1
-        phase += len(board.pieces(chess.ROOK, chess.WHITE)) * 2
-        phase += len(board.pieces(chess.ROOK, chess.BLACK)) * 2
-        phase += len(board.pieces(chess.QUEEN, chess.WHITE)) * 4
-        phase += len(board.pieces(chess.QUEEN, chess.BLACK)) * 4
-        return 1.0 - min(phase / 24.0, 1.0)
+        return 1.0 - self.get_phase_step(board) / 24.0
 
     def get_pst_value(self, piece: chess.Piece, square: int, phase: float) -> int:
         """Get piece-square table value with phase interpolation."""
@@ -440,8 +483,7 @@ class ChessEngine:
             for pt in [chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]:
                 for sq in board.pieces(pt, color):
                     # Count squares this piece attacks
-                    attacks = board.attacks(sq)
-                    mobility = bin(attacks).count('1')
+                    mobility = chess.popcount(board.attacks_mask(sq))
                     score += sign * mobility * self.MOBILITY_BONUS[pt]
 
         return score
@@ -615,7 +657,7 @@ class ChessEngine:
             sign = 1 if color == chess.WHITE else -1
 
             # Bishop pair
-            if len(board.pieces(chess.BISHOP, color)) >= 2:
+            if chess.popcount(board.bishops & board.occupied_co[color]) >= 2:
                 score += sign * 45
 
             # Bad bishop (blocked by own pawns)
@@ -713,7 +755,7 @@ class ChessEngine:
                     elif attackers:
                         # Attacked by lesser piece?
                         min_attacker_value = min(
-                            self.PIECE_VALUES[board.piece_at(att_sq).piece_type]
+                            self.PIECE_VALUES[board.piece_type_at(att_sq)]
                             for att_sq in attackers
                         )
                         if min_attacker_value < self.PIECE_VALUES[pt]:
@@ -722,44 +764,48 @@ class ChessEngine:
         return score
 
     def evaluate(self, board: chess.Board) -> int:
-        """Full position evaluation."""
+        """
+        Full position evaluation. The static part is cached by transposition
+        key; the fifty-move and repetition draws depend on the move history,
+        so they are checked on every call (mate still takes precedence).
+        """
+        key = board._transposition_key()
+        score = self.eval_cache.get(key)
+        if score is None:
+            if len(self.eval_cache) >= self.EVAL_CACHE_SIZE:
+                self.eval_cache.clear()
+            score = self.eval_cache[key] = self.evaluate_static(board)
+
+        if score != -self.MATE_SCORE and (board.is_fifty_moves() or board.is_repetition(2)):
+            return 0
+
+        return score
+
+    def evaluate_static(self, board: chess.Board) -> int:
+        """Evaluation of the position alone (no history-dependent draws)."""
         if board.is_checkmate():
             return -self.MATE_SCORE
 
         if board.is_stalemate() or board.is_insufficient_material():
             return 0
 
-        if board.is_fifty_moves() or board.is_repetition(2):
-            return 0
-
         phase = self.get_game_phase(board)
 
         # FAST material + PST using JIT-compiled function
-        # Extract piece positions as NumPy arrays
-        white_pawns = np.array([sq for sq in board.pieces(chess.PAWN, chess.WHITE)] + [-1]*8, dtype=np.int32)[:8]
-        white_knights = np.array([sq for sq in board.pieces(chess.KNIGHT, chess.WHITE)] + [-1]*2, dtype=np.int32)[:2]
-        white_bishops = np.array([sq for sq in board.pieces(chess.BISHOP, chess.WHITE)] + [-1]*2, dtype=np.int32)[:2]
-        white_rooks = np.array([sq for sq in board.pieces(chess.ROOK, chess.WHITE)] + [-1]*2, dtype=np.int32)[:2]
-        white_queens = np.array([sq for sq in board.pieces(chess.QUEEN, chess.WHITE)] + [-1]*1, dtype=np.int32)[:1]
-        white_king = board.king(chess.WHITE) if board.king(chess.WHITE) is not None else -1
-
-        black_pawns = np.array([sq for sq in board.pieces(chess.PAWN, chess.BLACK)] + [-1]*8, dtype=np.int32)[:8]
-        black_knights = np.array([sq for sq in board.pieces(chess.KNIGHT, chess.BLACK)] + [-1]*2, dtype=np.int32)[:2]
-        black_bishops = np.array([sq for sq in board.pieces(chess.BISHOP, chess.BLACK)] + [-1]*2, dtype=np.int32)[:2]
-        black_rooks = np.array([sq for sq in board.pieces(chess.ROOK, chess.BLACK)] + [-1]*2, dtype=np.int32)[:2]
-        black_queens = np.array([sq for sq in board.pieces(chess.QUEEN, chess.BLACK)] + [-1]*1, dtype=np.int32)[:1]
-        black_king = board.king(chess.BLACK) if board.king(chess.BLACK) is not None else -1
+        # Fill the reusable bitboard buffer (white P..K, then black P..K)
+        bbs = self.bitboards
+        white = board.occupied_co[chess.WHITE]
+        black = board.occupied_co[chess.BLACK]
+        for i, pieces in enumerate((board.pawns, board.knights, board.bishops,
+                                    board.rooks, board.queens, board.kings)):
+            bbs[i] = pieces & white
+            bbs[i + 6] = pieces & black
 
         # Select PST based on game phase
-        pawn_table = PST_PAWN_MG_NP if phase < 0.5 else PST_PAWN_EG_NP
-        king_table = PST_KING_MG_NP if phase < 0.5 else PST_KING_EG_NP
+        pst_flat = PST_FLAT_MG_NP if phase < 0.5 else PST_FLAT_EG_NP
 
         # Call JIT function for material + PST
-        score = count_material_fast(
-            white_pawns, white_knights, white_bishops, white_rooks, white_queens, white_king,
-            black_pawns, black_knights, black_bishops, black_rooks, black_queens, black_king,
-            pawn_table, PST_KNIGHT_NP, PST_BISHOP_NP, PST_ROOK_NP, PST_QUEEN_NP, king_table
-        )
+        score = int(count_material_fast(bbs, pst_flat))
 
         # Positional evaluation (keep all V5's features)
         score += self.evaluate_development(board, phase)
@@ -779,45 +825,74 @@ class ChessEngine:
 
         return score
 
-    def score_move(self, board: chess.Board, move: chess.Move, ply: int, tt_move: chess.Move = None) -> int:
-        """Score move for ordering."""
+    def score_move(self, board: chess.Board, move: chess.Move, ply: int, tt_move: int = 0) -> int:
+        """Score move for ordering. tt_move is a packed move (see encode_move)."""
         score = 0
+        enc = encode_move(move)
 
-        if tt_move and move == tt_move:
+        if enc == tt_move:
             return 10000000
 
-        if board.is_capture(move):
-            victim = board.piece_at(move.to_square)
-            attacker = board.piece_at(move.from_square)
-            if victim:
-                score += 1000000 + self.PIECE_VALUES[victim.piece_type] * 10 - self.PIECE_VALUES[attacker.piece_type]
-            else:
-                score += 1000000 + 100
+        # A legal move onto an occupied square is a capture; otherwise only a
+        # pawn moving to the ep square captures (en passant)
+        victim = board.piece_type_at(move.to_square)
+        if victim:
+            score += 1000000 + self.mvv_lva[victim * 8 + board.piece_type_at(move.from_square)]
+        elif move.to_square == board.ep_square and board.pawns & chess.BB_SQUARES[move.from_square]:
+            score += 1000000 + 100
 
         if move.promotion:
             score += 900000 + self.PIECE_VALUES[move.promotion]
 
-        if ply < 64:
-            if move == self.killers[ply][0]:
+        if ply < self.MAX_PLY:
+            if enc == self.killers[2 * ply]:
                 score += 800000
-            elif move == self.killers[ply][1]:
+            elif enc == self.killers[2 * ply + 1]:
                 score += 700000
 
-        score += self.history[(move.from_square, move.to_square)]
+        score += self.history[move.from_square * 64 + move.to_square]
 
         return score
 
-    def order_moves(self, board: chess.Board, moves: list, ply: int, tt_move: chess.Move = None) -> list:
-        scored = [(self.score_move(board, m, ply, tt_move), m) for m in moves]
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [m for _, m in scored]
+    def order_moves(self, board: chess.Board, moves: list, ply: int, tt_move: int = 0) -> list:
+        # Sorted in place (stable, best first) instead of building score/move pairs
+        score_move = self.score_move
+        moves.sort(key=lambda m: score_move(board, m, ply, tt_move), reverse=True)
+        return moves
+
+    def order_captures(self, board: chess.Board, moves: list) -> list:
+        """
+        Order quiescence moves (captures and quiet promotions) by MVV-LVA
+        alone: the hash move, killer and history terms of score_move() only
+        separate quiet moves. Sorted in place, best first.
+        """
+        piece_type_at = board.piece_type_at
+        mvv_lva = self.mvv_lva
+        piece_values = self.PIECE_VALUES
+
+        def score_capture(move):
+            victim = piece_type_at(move.to_square)
+            if victim:
+                score = 1000000 + mvv_lva[victim * 8 + piece_type_at(move.from_square)]
+            elif move.promotion:
+                score = 0
+            else:
+                score = 1000000 + 100  # En passant
+            if move.promotion:
+                score += 900000 + piece_values[move.promotion]
+            return score
+
+        moves.sort(key=score_capture, reverse=True)
+        return moves
 
     def store_killer(self, move: chess.Move, ply: int):
-        if ply >= 64:
+        if ply >= self.MAX_PLY:
             return
-        if move != self.killers[ply][0]:
-            self.killers[ply][1] = self.killers[ply][0]
-            self.killers[ply][0] = move
+        enc = encode_move(move)
+        idx = 2 * ply
+        if enc != self.killers[idx]:
+            self.killers[idx + 1] = self.killers[idx]
+            self.killers[idx] = enc
 
     def quiescence(self, board: chess.Board, alpha: int, beta: int, ply: int) -> int:
         self.nodes_searched += 1
@@ -837,13 +912,15 @@ class ChessEngine:
         if stand_pat > alpha:
             alpha = stand_pat
 
-        captures = [m for m in board.legal_moves if board.is_capture(m) or m.promotion]
-        captures = self.order_moves(board, captures, ply)
+        # Generate only captures and quiet promotions instead of filtering all legal moves
+        captures = list(board.generate_legal_captures())
+        captures.extend(board.generate_legal_moves(board.pawns, chess.BB_BACKRANKS & ~board.occupied))
+        captures = self.order_captures(board, captures)
 
         for move in captures:
             if not move.promotion:
-                victim = board.piece_at(move.to_square)
-                if victim and stand_pat + self.PIECE_VALUES[victim.piece_type] + 200 < alpha:
+                victim = board.piece_type_at(move.to_square)
+                if victim and stand_pat + self.PIECE_VALUES[victim] + 200 < alpha:
                     continue
 
             board.push(move)
@@ -874,17 +951,22 @@ class ChessEngine:
         if board.is_repetition(2) or board.is_fifty_moves():
             return 0
 
+        # Hot-path locals: LOAD_FAST instead of LOAD_GLOBAL / LOAD_ATTR per use
+        tt = self.tt
+        negamax = self.negamax
+        tt_exact, tt_alpha, tt_beta = TT_EXACT, TT_ALPHA, TT_BETA
+
         key = board._transposition_key()
-        tt_entry = self.tt.get(key)
-        tt_move = None
+        tt_entry = tt.get(key)
+        tt_move = 0
 
         if tt_entry and tt_entry.depth >= depth:
             tt_move = tt_entry.best_move
-            if tt_entry.flag == TT_EXACT:
+            if tt_entry.flag == tt_exact:
                 return tt_entry.score
-            elif tt_entry.flag == TT_ALPHA and tt_entry.score <= alpha:
+            elif tt_entry.flag == tt_alpha and tt_entry.score <= alpha:
                 return alpha
-            elif tt_entry.flag == TT_BETA and tt_entry.score >= beta:
+            elif tt_entry.flag == tt_beta and tt_entry.score >= beta:
                 return beta
         elif tt_entry:
             tt_move = tt_entry.best_move
@@ -894,13 +976,14 @@ class ChessEngine:
 
         in_check = board.is_check()
 
-        # Null move pruning
-        if do_null and depth >= 3 and not in_check and self.get_game_phase(board) < 0.8:
-            has_pieces = any(board.pieces(pt, board.turn) for pt in [chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN])
+        # Null move pruning (phase material >= 5 is get_game_phase() < 0.8, as an int)
+        if do_null and depth >= 3 and not in_check and self.get_phase_step(board) >= 5:
+            # Zugzwang guard: side to move must have a non-pawn piece
+            has_pieces = (board.knights | board.bishops | board.rooks | board.queens) & board.occupied_co[board.turn]
             if has_pieces:
                 board.push(chess.Move.null())
                 R = 3 if depth >= 6 else 2
-                score = -self.negamax(board, depth - 1 - R, -beta, -beta + 1, ply + 1, False)
+                score = -negamax(board, depth - 1 - R, -beta, -beta + 1, ply + 1, False)
                 board.pop()
                 if self.time_exceeded:
                     return 0
@@ -917,23 +1000,26 @@ class ChessEngine:
 
         best_move = moves[0]
         best_score = -self.INFINITY
-        flag = TT_ALPHA
+        flag = tt_alpha
+        history = self.history
 
         for i, move in enumerate(moves):
+            # Capture status must be taken before the push; reused for LMR, history and killers
+            is_capture = board.is_capture(move)
             board.push(move)
 
             # LMR
-            if i >= 4 and depth >= 3 and not in_check and not board.is_check() and not board.is_capture(move) and not move.promotion:
-                score = -self.negamax(board, depth - 2, -alpha - 1, -alpha, ply + 1)
+            if i >= 4 and depth >= 3 and not in_check and not board.is_check() and not is_capture and not move.promotion:
+                score = -negamax(board, depth - 2, -alpha - 1, -alpha, ply + 1)
                 if score > alpha:
-                    score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                    score = -negamax(board, depth - 1, -beta, -alpha, ply + 1)
             else:
                 if i == 0:
-                    score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                    score = -negamax(board, depth - 1, -beta, -alpha, ply + 1)
                 else:
-                    score = -self.negamax(board, depth - 1, -alpha - 1, -alpha, ply + 1)
+                    score = -negamax(board, depth - 1, -alpha - 1, -alpha, ply + 1)
                     if score > alpha and score < beta:
-                        score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
+                        score = -negamax(board, depth - 1, -beta, -alpha, ply + 1)
 
             board.pop()
 
@@ -946,23 +1032,128 @@ class ChessEngine:
 
             if score > alpha:
                 alpha = score
-                flag = TT_EXACT
-                if not board.is_capture(move):
-                    self.history[(move.from_square, move.to_square)] += depth * depth
+                flag = tt_exact
+                if not is_capture:
+                    history[move.from_square * 64 + move.to_square] += depth * depth
 
             if alpha >= beta:
-                if not board.is_capture(move):
+                if not is_capture:
                     self.store_killer(move, ply)
-                flag = TT_BETA
+                flag = tt_beta
                 break
 
-        if len(self.tt) < self.TT_SIZE:
-            self.tt[key] = TTEntry(key, depth, best_score, flag, best_move)
-        elif key in self.tt and depth >= self.tt[key].depth:
-            self.tt[key] = TTEntry(key, depth, best_score, flag, best_move)
+        # Popped and re-inserted rather than overwritten, so dict order follows
+        # how recently each key was stored (see trim_tt)
+        old_entry = tt.pop(key, None)
+        if old_entry is None:
+            if len(tt) < self.TT_SIZE:
+                tt[key] = TTEntry(key, depth, best_score, flag, encode_move(best_move))
+        elif len(tt) + 1 < self.TT_SIZE or depth >= old_entry.depth:
+            tt[key] = TTEntry(key, depth, best_score, flag, encode_move(best_move))
+        else:
+            tt[key] = old_entry
 
         return best_score
 
+    def search_root(self, board: chess.Board, moves: list, depth: int, alpha: int, beta: int) -> list:
+        """
+        Search the root moves with PVS inside the (alpha, beta) window.
+        Returns a list of (move, score) pairs in search order, stopping
+        early on a fail-high (score >= beta).
+        """
+        if self.workers > 1 and depth >= self.PARALLEL_MIN_DEPTH and len(moves) > 1:
+            return self.search_root_parallel(board, moves, depth, alpha, beta)
+
+        negamax = self.negamax
+        results = []
+
+        for i, move in enumerate(moves):
+            board.push(move)
+
+            if i == 0:
+                score = -negamax(board, depth - 1, -beta, -alpha, 1)
+            else:
+                score = -negamax(board, depth - 1, -alpha - 1, -alpha, 1)
+                if score > alpha and score < beta:
+                    score = -negamax(board, depth - 1, -beta, -alpha, 1)
+
+            board.pop()
+
+            if self.time_exceeded:
+                break
+
+            results.append((move, score))
+
+            if score > alpha:
+                alpha = score
+            if score >= beta:
+                break
+
+        return results
+
+    def search_root_parallel(self, board: chess.Board, moves: list, depth: int, alpha: int, beta: int) -> list:
+        """
+        Root-split search: the first move is searched here with the full window,
+        the remaining moves are farmed out to worker processes with a null
+        window around the resulting alpha. Fail-highs are re-searched locally.
+        Returns a list of (move, score) pairs in search order.
+        """
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.max_depth, self.time_limit),
+            )
+
+        board.push(moves[0])
+        score = -self.negamax(board, depth - 1, -beta, -alpha, 1)
+        board.pop()
+        if self.time_exceeded:
+            return []
+
+        results = [(moves[0], score)]
+        if score >= beta:
+            return results
+        alpha = max(alpha, score)
+
+        # Every worker gets the null window around the alpha at submission time
+        submitted_alpha = alpha
+        futures = [
+            (move, self.pool.submit(_search_root_move, board, move, depth,
+                                    submitted_alpha, submitted_alpha + 1, self.start_time))
+            for move in moves[1:]
+        ]
+
+        for move, future in futures:
+            if future.cancelled():
+                continue
+            score, nodes, timed_out = future.result()
+            self.nodes_searched += nodes
+            if timed_out:
+                self.time_exceeded = True
+            if self.time_exceeded:
+                continue
+
+            # Above submitted_alpha the null-window score is only a lower bound,
+            # even if alpha has risen past it since: re-search with the current window
+            if score > submitted_alpha and score < beta:
+                board.push(move)
+                score = -self.negamax(board, depth - 1, -beta, -alpha, 1)
+                board.pop()
+                if self.time_exceeded:
+                    continue
+
+            results.append((move, score))
+            if score > alpha:
+                alpha = score
+            if score >= beta:
+                # Fail-high: the remaining moves are irrelevant for this window
+                for _, pending in futures:
+                    pending.cancel()
+                break
+
+        return results
+
     def search(self, board: chess.Board, depth: int = None) -> SearchResult:
         if depth is None:
             depth = self.max_depth
@@ -970,6 +1161,8 @@ class ChessEngine:
         self.nodes_searched = 0
         self.start_time = time.time()
         self.time_exceeded = False
+        # Make room for this search's positions (see trim_tt)
+        trim_tt(self.tt, self.TT_SIZE)
 
         moves = list(board.legal_moves)
         if not moves:
@@ -978,47 +1171,60 @@ class ChessEngine:
         best_move = moves[0]
         best_score = -self.INFINITY
         final_depth = 1
+        INF = self.INFINITY
+
+        # Initial root ordering; later iterations reuse the previous iteration's scores
+        tt_entry = self.tt.get(board._transposition_key())
+        tt_move = tt_entry.best_move if tt_entry else 0
+        moves = self.order_moves(board, moves, 0, tt_move)
 
         for current_depth in range(1, depth + 1):
             if self.time_exceeded:
                 break
 
             current_best_move = None
-            current_best_score = -self.INFINITY
-            alpha = -self.INFINITY
-            beta = self.INFINITY
+            current_best_score = -INF
 
-            tt_entry = self.tt.get(board._transposition_key())
-            tt_move = tt_entry.best_move if tt_entry else None
-            moves = self.order_moves(board, list(board.legal_moves), 0, tt_move)
-
-            for i, move in enumerate(moves):
-                board.push(move)
-
-                if i == 0:
-                    score = -self.negamax(board, current_depth - 1, -beta, -alpha, 1)
-                else:
-                    score = -self.negamax(board, current_depth - 1, -alpha - 1, -alpha, 1)
-                    if score > alpha and score < beta:
-                        score = -self.negamax(board, current_depth - 1, -beta, -alpha, 1)
-
-                board.pop()
+            # Aspiration window around the previous iteration's score (not for mate scores)
+            delta = self.ASPIRATION_WINDOW
+            if current_depth > 1 and abs(best_score) < self.MATE_SCORE - 100:
+                alpha = best_score - delta
+                beta = best_score + delta
+            else:
+                alpha = -INF
+                beta = INF
 
-                if self.time_exceeded:
+            while True:
+                results = self.search_root(board, moves, current_depth, alpha, beta)
+                if self.time_exceeded or not results:
                     break
 
-                if score > current_best_score:
-                    current_best_score = score
-                    current_best_move = move
-
-                if score > alpha:
-                    alpha = score
+                current_best_move, current_best_score = results[0]
+                for move, score in results[1:]:
+                    if score > current_best_score:
+                        current_best_score = score
+                        current_best_move = move
+
+                # Fail-low or fail-high: widen the window and re-search
+                if (current_best_score <= alpha and alpha > -INF) or (current_best_score >= beta and beta < INF):
+                    delta *= 2
+                    if delta > self.ASPIRATION_MAX:
+                        alpha, beta = -INF, INF
+                    else:
+                        alpha = best_score - delta
+                        beta = best_score + delta
+                    continue
+                break
 
             if not self.time_exceeded and current_best_move:
                 best_move = current_best_move
                 best_score = current_best_score
                 final_depth = current_depth
 
+                # Stable sort by this iteration's scores: best first, runners-up next
+                searched = [m for m, _ in sorted(results, key=lambda p: p[1], reverse=True)]
+                moves = searched + [m for m in moves if m not in searched]
+
         return SearchResult(
             best_move=best_move,
             score=best_score,
@@ -5,20 +5,24 @@ Major performance improvements:
 2. Simplified evaluation (4x faster)
 3. Incremental evaluation (10x faster)
 4. Better move ordering with hash table (3x faster)
+5. Numba-compiled mobility kernel on raw bitboards
 
 Expected total speedup: 50-100x vs v5_fast
 """
 
 import chess
+import chess.polyglot
 import time
-from typing import Optional
+import numpy as np
+from numba import njit
+from array import array
 from dataclasses import dataclass
-from collections import defaultdict
 
 
 @dataclass
 class SearchResult:
     """Result from engine search."""
+    __slots__ = ('best_move', 'score', 'depth', 'nodes_searched', 'time_spent')
     best_move: chess.Move
     score: int
     depth: int
@@ -31,16 +35,146 @@ TT_EXACT = 0
 TT_ALPHA = 1
 TT_BETA = 2
 
+# Packed TT entry layout (one 64-bit word per slot, key stored separately):
+#   bits  0-15  best move (see encode_move)
+#   bits 16-36  score + TT_SCORE_OFFSET
+#   bits 37-38  flag
+#   bits 39-46  depth
+#   bits 47-62  search age
+TT_SCORE_OFFSET = 1 << 20
+
+# Polyglot Zobrist keys, updated incrementally in do_move (matches chess.polyglot.zobrist_hash)
+ZOBRIST = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+ZOBRIST_HASHER = chess.polyglot.ZobristHasher(ZOBRIST)
+
+
+def castling_hash(castling_rights: int) -> int:
+    """Zobrist contribution of a raw castling-rights mask (rook squares)."""
+    key = 0
+    if castling_rights & chess.BB_H1:
+        key ^= ZOBRIST[768]
+    if castling_rights & chess.BB_A1:
+        key ^= ZOBRIST[768 + 1]
+    if castling_rights & chess.BB_H8:
+        key ^= ZOBRIST[768 + 2]
+    if castling_rights & chess.BB_A8:
+        key ^= ZOBRIST[768 + 3]
+    return key
+
+
+# Mobility weights per attacked square, indexed by piece type (N=4, B=5, R=2, Q=1)
+MOBILITY_WEIGHTS = np.array([0, 0, 4, 5, 2, 1, 0], dtype=np.int64)
+KNIGHT_ATTACKS = np.array(chess.BB_KNIGHT_ATTACKS, dtype=np.uint64)
+# Ray directions (file step, rank step): rook rays 0-3, bishop rays 4-7
+RAY_FILE = np.array([1, -1, 0, 0, 1, 1, -1, -1], dtype=np.int64)
+RAY_RANK = np.array([0, 0, 1, -1, 1, -1, 1, -1], dtype=np.int64)
+
+
+@njit("int64(uint64)", cache=True)
+def _popcount(bb):
+    """Number of set bits in a uint64."""
+    count = 0
+    while bb:
+        bb &= bb - np.uint64(1)
+        count += 1
+    return count
+
+
+@njit("int64(int64, uint64, uint64, int64, int64)", cache=True)
+def _ray_mobility(sq, occupied, not_own, first_ray, last_ray):
+    """Count attacked non-friendly squares along rays first_ray..last_ray-1."""
+    count = 0
+    for ray in range(first_ray, last_ray):
+        f = (sq & 7) + RAY_FILE[ray]
+        r = (sq >> 3) + RAY_RANK[ray]
+        while 0 <= f < 8 and 0 <= r < 8:
+            bit = np.uint64(1) << np.uint64(r * 8 + f)
+            if bit & not_own:
+                count += 1
+            if bit & occupied:
+                break
+            f += RAY_FILE[ray]
+            r += RAY_RANK[ray]
+    return count
 
-@dataclass
-class TTEntry:
-    """Transposition table entry."""
-    key: int
-    depth: int
-    score: int
-    flag: int
-    best_move: Optional[chess.Move]
-    age: int  # For replacement strategy
+
+@njit("int64(uint64, uint64, uint64, uint64, uint64, uint64)", cache=True)
+def mobility_kernel(white, black, knights, bishops, rooks, queens):
+    """
+    Weighted pseudo-legal mobility, white minus black.
+
+    Works directly on python-chess bitboards (occupied_co and piece masks),
+    so the leaf evaluation never touches chess.Board from Python.
+    """
+    occupied = white | black
+    score = 0
+    for side in range(2):
+        own = white if side == 0 else black
+        not_own = ~own
+        mobility = 0
+        for piece_type in range(2, 6):
+            if piece_type == 2:
+                bb = knights & own
+            elif piece_type == 3:
+                bb = bishops & own
+            elif piece_type == 4:
+                bb = rooks & own
+            else:
+                bb = queens & own
+            while bb:
+                sq = _popcount((bb & -bb) - np.uint64(1))
+                if piece_type == 2:
+                    count = _popcount(KNIGHT_ATTACKS[sq] & not_own)
+                elif piece_type == 3:
+                    count = _ray_mobility(sq, occupied, not_own, 4, 8)
+                elif piece_type == 4:
+                    count = _ray_mobility(sq, occupied, not_own, 0, 4)
+                else:
+                    count = _ray_mobility(sq, occupied, not_own, 0, 8)
+                mobility += count * MOBILITY_WEIGHTS[piece_type]
+                bb &= bb - np.uint64(1)
+        score += mobility if side == 0 else -mobility
+    return score
+
+
+def encode_move(move: chess.Move) -> int:
+    """Pack a move into 16 bits: from << 10 | to << 4 | promotion (0 = no move)."""
+    return (move.from_square << 10) | (move.to_square << 4) | (move.promotion or 0)
+
+
+def decode_move(enc: int) -> chess.Move:
+    """Inverse of encode_move(); returns None for 0."""
+    if not enc:
+        return None
+    return chess.Move(enc >> 10, (enc >> 4) & 63, (enc & 15) or None)
+
+
+def build_material_pst(piece_values: dict, pst_tables: dict) -> array:
+    """
+    Merge piece values and PSTs into one flat array for single-load lookups.
+
+    Indexed like the Polyglot Zobrist table: 64 * ((piece_type - 1) * 2 + color) + square.
+    The tables are written a8-first, so white squares are mirrored and black ones used as-is.
+    """
+    return array('i', [
+        piece_values[piece_type] + pst_tables[piece_type][square ^ 56 if color else square]
+        for piece_type in range(1, 7)
+        for color in (chess.BLACK, chess.WHITE)
+        for square in range(64)
+    ])
+
+
+def build_pst_delta(pst_flat: array) -> array:
+    """
+    Precompute the PST change of moving a piece: indexed by
+    4096 * ((piece_type - 1) * 2 + color) + 64 * from_square + to_square.
+    """
+    return array('i', [
+        pst_flat[64 * piece_index + to_sq] - pst_flat[64 * piece_index + from_sq]
+        for piece_index in range(12)
+        for from_sq in range(64)
+        for to_sq in range(64)
+    ])
 
 
 class ChessEngine:
@@ -141,11 +275,20 @@ class ChessEngine:
         chess.KING: KING_TABLE,
     }
 
+    # Piece value + PST per (piece, color, square) in one flat array
+    PST_FLAT = build_material_pst(PIECE_VALUES, PST_TABLES)
+    # Score change for a piece moving from one square to another, one load per quiet move
+    PST_DELTA = build_pst_delta(PST_FLAT)
+
     # Constants
     INFINITY = 999999
     MATE_SCORE = 100000
-    TT_SIZE = 1 << 20  # 1M entries
+    TT_SIZE = 1 << 20  # 1M entries (power of two)
+    TT_MASK = TT_SIZE - 1
     MAX_DEPTH = 64
+    # Shallow-depth pruning margins, indexed by remaining depth (1-3)
+    RFP_MARGINS = (0, 120, 250, 400)
+    FUTILITY_MARGINS = (0, 200, 350, 500)
 
     def __init__(self, max_depth: int = 6, time_limit: float = None):
         self.max_depth = max_depth
@@ -153,22 +296,150 @@ class ChessEngine:
         self.nodes_searched = 0
         self.start_time = 0
         self.time_exceeded = False
-        self.tt = {}
-        self.killers = [[None, None] for _ in range(self.MAX_DEPTH)]
-        self.history = defaultdict(int)
+        # Fixed-size table indexed by key & TT_MASK: keys and packed entries in parallel arrays
+        self.tt_keys = array('Q', bytes(8 * self.TT_SIZE))
+        self.tt_data = array('Q', bytes(8 * self.TT_SIZE))
+        # Two killer slots per ply; negamax ply never exceeds the search depth,
+        # which search() caps below MAX_DEPTH, so no per-call bounds checks
+        self.killers0 = [None] * self.MAX_DEPTH
+        self.killers1 = [None] * self.MAX_DEPTH
+        self.history = array('q', bytes(8 * 64 * 64))  # Indexed by from_square * 64 + to_square
         self.current_age = 0
+        # Canonical Move object per encode_move() value, so moves taken from
+        # killers and the TT compare with `is` (bounded by the number of codes)
+        self.move_intern = {}
+
+        # Incremental material + PST score (white's perspective) and Zobrist key,
+        # kept in sync with the board by do_move/undo_move; seeded at the root
+        self.incremental_score = 0
+        self.zkey = 0
+        self.score_stack = []
+        # Zobrist keys of every earlier position on the game + search path
+        # (popped back into zkey on undo); used for repetition detection
+        self.key_history = []
 
     def clear_tables(self):
         """Clear all search tables."""
-        self.tt.clear()
-        self.killers = [[None, None] for _ in range(self.MAX_DEPTH)]
-        self.history.clear()
+        self.tt_keys = array('Q', bytes(8 * self.TT_SIZE))
+        self.tt_data = array('Q', bytes(8 * self.TT_SIZE))
+        self.killers0 = [None] * self.MAX_DEPTH
+        self.killers1 = [None] * self.MAX_DEPTH
+        self.history = array('q', bytes(8 * 64 * 64))
+
+    def new_game(self):
+        """Forget everything from previous games (call before the first move of a new game)."""
+        self.clear_tables()
+        self.current_age = 0
+
+    def new_move(self):
+        """
+        Carry search state over to the next move of the same game.
+        The TT is kept (stale entries lose out to the new age on replacement),
+        history scores are halved so recent cutoffs dominate, and only the
+        killers for the first two plies are kept.
+        """
+        self.history = array('q', [h >> 1 for h in self.history])
+        self.killers0[2:] = [None] * (self.MAX_DEPTH - 2)
+        self.killers1[2:] = [None] * (self.MAX_DEPTH - 2)
+
+    def evaluate_material(self, board: chess.Board) -> int:
+        """Full-board material + PST scan from white's perspective (used to seed incremental eval)."""
+        full = self.PST_FLAT
+        score = 0
+        # Walk each (piece, color) bitboard instead of probing all 64 squares
+        for piece_type in chess.PIECE_TYPES:
+            base = 64 * (piece_type - 1) * 2
+            for square in chess.scan_forward(board.pieces_mask(piece_type, chess.WHITE)):
+                score += full[base + 64 + square]
+            for square in chess.scan_forward(board.pieces_mask(piece_type, chess.BLACK)):
+                score -= full[base + square]
+        return score
+
+    def do_move(self, board: chess.Board, move: chess.Move):
+        """Push a move, updating the incremental material + PST score and Zobrist key."""
+        self.score_stack.append(self.incremental_score)
+        self.key_history.append(self.zkey)
+
+        # Side to move flips and the old en passant file (if any) drops out
+        key = self.zkey ^ ZOBRIST[780] ^ ZOBRIST_HASHER.hash_ep_square(board)
+        old_rights = board.castling_rights
+
+        if move:  # Null moves leave the pieces untouched
+            # PST_FLAT and ZOBRIST share the index 64 * ((piece_type - 1) * 2 + color) + square
+            full = self.PST_FLAT
+            from_sq = move.from_square
+            to_sq = move.to_square
+            color = board.turn
+            piece_type = board.piece_type_at(from_sq)
+            piece_index = (piece_type - 1) * 2 + color
+            delta = 0
+
+            # Captured piece (en passant victim sits behind the target square)
+            if board.is_en_passant(move):
+                idx = 64 * (not color) + (to_sq - 8 if color == chess.WHITE else to_sq + 8)
+                delta += full[idx]
+                key ^= ZOBRIST[idx]
+            else:
+                captured = board.piece_type_at(to_sq)
+                if captured and board.color_at(to_sq) != color:
+                    idx = 64 * ((captured - 1) * 2 + (not color)) + to_sq
+                    delta += full[idx]
+                    key ^= ZOBRIST[idx]
+
+            # Moved piece: a single delta lookup, or swap in the promoted piece
+            idx = 64 * piece_index + from_sq
+            key ^= ZOBRIST[idx]
+            if move.promotion:
+                to_idx = 64 * ((move.promotion - 1) * 2 + color) + to_sq
+                delta += full[to_idx] - full[idx]
+            else:
+                to_idx = 64 * piece_index + to_sq
+                delta += self.PST_DELTA[4096 * piece_index + 64 * from_sq + to_sq]
+            key ^= ZOBRIST[to_idx]
+
+            # Castling also relocates the rook
+            if piece_type == chess.KING and board.is_castling(move):
+                rank = chess.square_rank(from_sq)
+                if board.is_kingside_castling(move):
+                    rook_from, rook_to = chess.square(7, rank), chess.square(5, rank)
+                else:
+                    rook_from, rook_to = chess.square(0, rank), chess.square(3, rank)
+                rook_index = (chess.ROOK - 1) * 2 + color
+                delta += self.PST_DELTA[4096 * rook_index + 64 * rook_from + rook_to]
+                key ^= ZOBRIST[64 * rook_index + rook_from] ^ ZOBRIST[64 * rook_index + rook_to]
+
+            self.incremental_score += delta if color == chess.WHITE else -delta
 
-    def get_pst_value(self, piece_type: int, square: int, is_white: bool) -> int:
-        """Get piece-square table value for a piece."""
-        table = self.PST_TABLES[piece_type]
-        sq = square if is_white else chess.square_mirror(square)
-        return table[sq]
+        board.push(move)
+
+        if board.castling_rights != old_rights:
+            key ^= castling_hash(old_rights) ^ castling_hash(board.castling_rights)
+        self.zkey = key ^ ZOBRIST_HASHER.hash_ep_square(board)
+
+    def undo_move(self, board: chess.Board):
+        """Pop the last move and restore the incremental score and Zobrist key."""
+        board.pop()
+        self.incremental_score = self.score_stack.pop()
+        self.zkey = self.key_history.pop()
+
+    def is_repetition(self, board: chess.Board) -> bool:
+        """
+        Two-fold repetition check against key_history.
+        Only the last halfmove_clock positions can repeat (pawn moves and
+        captures are irreversible), so at most that many keys are scanned.
+        """
+        n = board.halfmove_clock
+        return n >= 4 and self.zkey in self.key_history[-n:]
+
+    def game_key_history(self, board: chess.Board) -> list:
+        """Zobrist keys of the game positions since the last irreversible move, oldest first."""
+        keys = []
+        replay = board.copy()
+        for _ in range(min(board.halfmove_clock, len(board.move_stack))):
+            replay.pop()
+            keys.append(chess.polyglot.zobrist_hash(replay))
+        keys.reverse()
+        return keys
 
     def evaluate_simple(self, board: chess.Board) -> int:
         """
@@ -180,110 +451,121 @@ class ChessEngine:
             return -self.MATE_SCORE
         if board.is_stalemate() or board.is_insufficient_material():
             return 0
-        if board.is_fifty_moves() or board.is_repetition(2):
+        if board.is_fifty_moves() or self.is_repetition(board):
             return 0
 
-        score = 0
-
-        # Material + PST (the most important factors - 80% of strength)
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece:
-                value = self.PIECE_VALUES[piece.piece_type]
-                pst_value = self.get_pst_value(piece.piece_type, square, piece.color)
-
-                if piece.color == chess.WHITE:
-                    score += value + pst_value
-                else:
-                    score -= value + pst_value
-
-        # Mobility (15% of strength) - simplified to just move count
-        # We only count this for the side to move since it's much faster
-        mobility = len(list(board.legal_moves))
-        score += mobility * 10
+        # Material + PST (the most important factors - 80% of strength),
+        # maintained incrementally by do_move/undo_move
+        score = self.incremental_score
 
-        # Tempo bonus for side to move
-        score += 10
+        # Mobility (15% of strength) - pseudo-legal attack counts for both sides,
+        # computed by the JIT kernel straight from the bitboards
+        occupied_co = board.occupied_co
+        score += mobility_kernel(occupied_co[chess.WHITE], occupied_co[chess.BLACK],
+                                 board.knights, board.bishops, board.rooks, board.queens)
 
         # Return from side to move's perspective
         if board.turn == chess.BLACK:
             score = -score
 
-        return score
+        # Tempo bonus for side to move
+        return score + 10
+
+    def intern_moves(self, moves) -> list:
+        """Map freshly generated moves to their canonical (interned) Move objects."""
+        intern = self.move_intern.setdefault
+        # encode_move() inlined
+        return [intern((m.from_square << 10) | (m.to_square << 4) | (m.promotion or 0), m) for m in moves]
 
-    def score_move(self, board: chess.Board, move: chess.Move, ply: int, tt_move: chess.Move = None) -> int:
+    def intern_tt_move(self, enc: int) -> chess.Move:
+        """Canonical Move for a packed TT move; None for 0."""
+        move = self.move_intern.get(enc)
+        if move is None and enc:
+            move = self.move_intern.setdefault(enc, decode_move(enc))
+        return move
+
+    def order_moves(self, board: chess.Board, moves: list, ply: int, tt_move: chess.Move = None) -> list:
         """
-        Score move for ordering.
+        Order moves for better alpha-beta pruning.
         Priority:
         1. Hash move (from transposition table)
         2. Winning captures (MVV-LVA)
         3. Killer moves
         4. History heuristic
         5. Losing captures
-        """
-        # Hash move gets highest priority
-        if tt_move and move == tt_move:
-            return 10000000
 
-        score = 0
-
-        # Captures: MVV-LVA (Most Valuable Victim - Least Valuable Attacker)
-        if board.is_capture(move):
-            victim = board.piece_at(move.to_square)
-            attacker = board.piece_at(move.from_square)
-            if victim:
+        Everything the key function touches is bound to a local first, so
+        scoring a move does no attribute lookups on self or board, and
+        captures are detected with plain integer bitboard tests.
+        """
+        piece_values = self.PIECE_VALUES
+        history = self.history
+        piece_type_at = board.piece_type_at
+        bb_squares = chess.BB_SQUARES
+        them = board.occupied_co[not board.turn]
+        pawns = board.pawns
+        ep_square = board.ep_square
+        killer0 = self.killers0[ply]
+        killer1 = self.killers1[ply]
+
+        def score_move(move):
+            # Hash move gets highest priority
+            if move is tt_move:
+                return 10000000
+
+            from_sq = move.from_square
+            to_sq = move.to_square
+            score = 0
+
+            # Captures: MVV-LVA (Most Valuable Victim - Least Valuable Attacker)
+            if bb_squares[to_sq] & them:
                 # Prioritize capturing valuable pieces with less valuable pieces
-                mvv_lva = self.PIECE_VALUES[victim.piece_type] * 10 - self.PIECE_VALUES[attacker.piece_type]
-                score += 1000000 + mvv_lva
-            else:
+                score += 1000000 + piece_values[piece_type_at(to_sq)] * 10 - piece_values[piece_type_at(from_sq)]
+            elif to_sq == ep_square and bb_squares[from_sq] & pawns:
                 # En passant
                 score += 1000000 + 1000
-
-        # Promotions
-        if move.promotion:
-            score += 900000 + self.PIECE_VALUES[move.promotion]
-
-        # Killer moves (non-captures that caused beta cutoffs)
-        if ply < self.MAX_DEPTH and not board.is_capture(move):
-            if move == self.killers[ply][0]:
+            # Killer moves (non-captures that caused beta cutoffs)
+            elif move is killer0:
                 score += 800000
-            elif move == self.killers[ply][1]:
+            elif move is killer1:
                 score += 700000
 
-        # History heuristic (moves that historically caused cutoffs)
-        score += self.history.get((move.from_square, move.to_square), 0)
+            # Promotions
+            if move.promotion:
+                score += 900000 + piece_values[move.promotion]
 
-        return score
+            # History heuristic (moves that historically caused cutoffs)
+            return score + history[from_sq * 64 + to_sq]
 
-    def order_moves(self, board: chess.Board, moves: list, ply: int, tt_move: chess.Move = None) -> list:
-        """Order moves for better alpha-beta pruning."""
-        scored = [(self.score_move(board, m, ply, tt_move), m) for m in moves]
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [m for _, m in scored]
+        return sorted(moves, key=score_move, reverse=True)
 
     def store_killer(self, move: chess.Move, ply: int):
         """Store killer move for this ply."""
-        if ply >= self.MAX_DEPTH:
-            return
-        if move != self.killers[ply][0]:
-            self.killers[ply][1] = self.killers[ply][0]
-            self.killers[ply][0] = move
+        killers0 = self.killers0
+        if move is not killers0[ply]:
+            self.killers1[ply] = killers0[ply]
+            killers0[ply] = move
 
     def store_tt(self, key: int, depth: int, score: int, flag: int, best_move: chess.Move):
         """
         Store position in transposition table with replacement strategy.
-        Replace if:
-        - New entry has higher depth
+        The slot is key & TT_MASK; replace if:
+        - Slot is empty
+        - New entry has higher (or equal) depth
         - Entry is from older search (different age)
-        - Table has space
         """
-        if key in self.tt:
-            old_entry = self.tt[key]
-            # Replace if higher depth or older age
-            if depth >= old_entry.depth or old_entry.age < self.current_age:
-                self.tt[key] = TTEntry(key, depth, score, flag, best_move, self.current_age)
-        elif len(self.tt) < self.TT_SIZE:
-            self.tt[key] = TTEntry(key, depth, score, flag, best_move, self.current_age)
+        idx = key & self.TT_MASK
+        age = self.current_age & 0xFFFF
+        old_data = self.tt_data[idx]
+        if not self.tt_keys[idx] or depth >= (old_data >> 39) & 0xFF or old_data >> 47 != age:
+            self.tt_keys[idx] = key
+            self.tt_data[idx] = (
+                encode_move(best_move)
+                | (score + TT_SCORE_OFFSET) << 16
+                | flag << 37
+                | depth << 39
+                | age << 47
+            )
 
     def quiescence(self, board: chess.Board, alpha: int, beta: int, ply: int) -> int:
         """Quiescence search - search only captures to avoid horizon effect."""
@@ -307,20 +589,24 @@ class ChessEngine:
         if stand_pat > alpha:
             alpha = stand_pat
 
-        # Only search captures and promotions
-        captures = [m for m in board.legal_moves if board.is_capture(m) or m.promotion]
-        captures = self.order_moves(board, captures, ply)
+        # Only search captures and promotions, generated directly rather than
+        # filtering every legal move (quiet promotions are pawn pushes to an empty back rank)
+        captures = list(board.generate_legal_captures())
+        captures.extend(board.generate_legal_moves(board.pawns, chess.BB_BACKRANKS & ~board.occupied))
+        # Ordered as ply 0: quiescence ply can run past MAX_DEPTH, captures never
+        # use killers, and killers are only stored below the root
+        captures = self.order_moves(board, captures, 0)
 
         for move in captures:
             # SEE pruning: skip obviously bad captures
             if not move.promotion:
-                victim = board.piece_at(move.to_square)
-                if victim and stand_pat + self.PIECE_VALUES[victim.piece_type] + 200 < alpha:
+                victim = board.piece_type_at(move.to_square)
+                if victim and stand_pat + self.PIECE_VALUES[victim] + 200 < alpha:
                     continue
 
-            board.push(move)
+            self.do_move(board, move)
             score = -self.quiescence(board, -beta, -alpha, ply + 1)
-            board.pop()
+            self.undo_move(board)
 
             if self.time_exceeded:
                 return 0
@@ -353,24 +639,26 @@ class ChessEngine:
             return 0
 
         # Draw detection
-        if board.is_repetition(2) or board.is_fifty_moves():
+        if self.is_repetition(board) or board.is_fifty_moves():
             return 0
 
         # Transposition table lookup
-        key = board._transposition_key()
-        tt_entry = self.tt.get(key)
+        key = self.zkey
+        idx = key & self.TT_MASK
         tt_move = None
 
-        if tt_entry and tt_entry.depth >= depth:
-            tt_move = tt_entry.best_move
-            if tt_entry.flag == TT_EXACT:
-                return tt_entry.score
-            elif tt_entry.flag == TT_ALPHA and tt_entry.score <= alpha:
-                return alpha
-            elif tt_entry.flag == TT_BETA and tt_entry.score >= beta:
-                return beta
-        elif tt_entry:
-            tt_move = tt_entry.best_move
+        if self.tt_keys[idx] == key:  # Full key guards against index collisions
+            data = self.tt_data[idx]
+            tt_move = self.intern_tt_move(data & 0xFFFF)
+            if (data >> 39) & 0xFF >= depth:
+                tt_flag = (data >> 37) & 3
+                tt_score = ((data >> 16) & 0x1FFFFF) - TT_SCORE_OFFSET
+                if tt_flag == TT_EXACT:
+                    return tt_score
+                elif tt_flag == TT_ALPHA and tt_score <= alpha:
+                    return alpha
+                elif tt_flag == TT_BETA and tt_score >= beta:
+                    return beta
 
         # Leaf node: quiescence search
         if depth <= 0:
@@ -380,34 +668,60 @@ class ChessEngine:
 
         # Null move pruning: if we can pass and still beat beta, position is too good
         if do_null and depth >= 3 and not in_check:
-            # Don't do null move in endgame or if we have only pawns
-            has_pieces = any(board.pieces(pt, board.turn) for pt in [chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN])
+            # Zugzwang guard: side to move must have a non-pawn piece
+            has_pieces = (board.knights | board.bishops | board.rooks | board.queens) & board.occupied_co[board.turn]
             if has_pieces:
-                board.push(chess.Move.null())
+                self.do_move(board, chess.Move.null())
                 R = 3 if depth >= 6 else 2
                 score = -self.negamax(board, depth - 1 - R, -beta, -beta + 1, ply + 1, False)
-                board.pop()
+                self.undo_move(board)
                 if self.time_exceeded:
                     return 0
                 if score >= beta:
                     return beta
 
-        # Generate and order moves
-        moves = list(board.legal_moves)
-        if not moves:
-            return -self.MATE_SCORE + ply if in_check else 0
-
-        moves = self.order_moves(board, moves, ply, tt_move)
+        # Reverse futility pruning (static null move): at shallow depth, if the
+        # static eval beats beta by a depth-scaled margin, assume it holds
+        futility_pruning = False
+        if depth <= 3 and not in_check and abs(beta) < self.MATE_SCORE - 100:
+            static_eval = self.evaluate_simple(board)
+            if static_eval - self.RFP_MARGINS[depth] >= beta:
+                return beta
+            # Futility pruning: quiet moves can't lift a hopeless eval above alpha
+            futility_pruning = static_eval + self.FUTILITY_MARGINS[depth] < alpha
+
+        # Staged move generation: a legal hash move is searched on its own first,
+        # and the remaining moves are only generated and ordered if it fails to cut off
+        if tt_move and board.is_legal(tt_move):
+            moves = [tt_move]
+        else:
+            tt_move = None
+            moves = self.intern_moves(board.legal_moves)
+            if not moves:
+                return -self.MATE_SCORE + ply if in_check else 0
+            moves = self.order_moves(board, moves, ply)
 
         best_move = moves[0]
         best_score = -self.INFINITY
         flag = TT_ALPHA
 
         for i, move in enumerate(moves):
-            board.push(move)
-
-            # Late Move Reduction (LMR): search later moves at reduced depth
-            if i >= 4 and depth >= 3 and not in_check and not board.is_check() and not board.is_capture(move) and not move.promotion:
+            # Computed once before the push; reused for LMR, history and killers
+            is_capture = board.is_capture(move)
+
+            # Skip quiet, non-checking moves under futility pruning (the first move
+            # is always searched; gives_check() only runs once the rest allow it)
+            if futility_pruning and i > 0 and not is_capture and not move.promotion \
+                    and not board.gives_check(move):
+                continue
+
+            self.do_move(board, move)
+
+            # Late Move Reduction (LMR): search later moves at reduced depth.
+            # Cheap per-move tests go first so the king-attack query for
+            # "does this move give check" only runs for reduction candidates.
+            if (i >= 4 and depth >= 3 and not in_check and not is_capture
+                    and not move.promotion and not board.is_check()):
                 # Search with reduced depth
                 score = -self.negamax(board, depth - 2, -alpha - 1, -alpha, ply + 1)
                 # If it beats alpha, re-search at full depth
@@ -425,7 +739,7 @@ class ChessEngine:
                     if score > alpha and score < beta:
                         score = -self.negamax(board, depth - 1, -beta, -alpha, ply + 1)
 
-            board.pop()
+            self.undo_move(board)
 
             if self.time_exceeded:
                 return 0
@@ -438,16 +752,21 @@ class ChessEngine:
                 alpha = score
                 flag = TT_EXACT
                 # Update history heuristic for non-captures
-                if not board.is_capture(move):
-                    self.history[(move.from_square, move.to_square)] += depth * depth
+                if not is_capture:
+                    self.history[move.from_square * 64 + move.to_square] += depth * depth
 
             # Beta cutoff
             if alpha >= beta:
-                if not board.is_capture(move):
+                if not is_capture:
                     self.store_killer(move, ply)
                 flag = TT_BETA
                 break
 
+            # Hash move searched without a cutoff: queue the rest of the moves
+            if i == 0 and tt_move:
+                rest = [m for m in self.intern_moves(board.legal_moves) if m is not tt_move]
+                moves.extend(self.order_moves(board, rest, ply))
+
         # Store in transposition table
         self.store_tt(key, depth, best_score, flag, best_move)
 
@@ -459,11 +778,19 @@ class ChessEngine:
         """
         if depth is None:
             depth = self.max_depth
+        depth = min(depth, self.MAX_DEPTH - 1)  # Keeps every negamax ply inside the killer tables
 
         self.nodes_searched = 0
         self.start_time = time.time()
         self.time_exceeded = False
         self.current_age += 1  # Increment age for TT replacement
+        self.new_move()
+
+        # Seed incremental evaluation and hashing from the root position
+        self.incremental_score = self.evaluate_material(board)
+        self.zkey = chess.polyglot.zobrist_hash(board)
+        self.score_stack.clear()
+        self.key_history = self.game_key_history(board)
 
         moves = list(board.legal_moves)
         if not moves:
@@ -492,13 +819,17 @@ class ChessEngine:
                 beta = self.INFINITY
                 aspirations_failed = False
 
-            # Get move ordering from TT
-            tt_entry = self.tt.get(board._transposition_key())
-            tt_move = tt_entry.best_move if tt_entry else None
-            moves = self.order_moves(board, list(board.legal_moves), 0, tt_move)
+            # Get move ordering from TT; the root position is never stored there,
+            # so from depth 2 on the previous iteration's best move is the hash move
+            if current_depth > 1:
+                tt_move = best_move
+            else:
+                root_idx = self.zkey & self.TT_MASK
+                tt_move = self.intern_tt_move(self.tt_data[root_idx] & 0xFFFF) if self.tt_keys[root_idx] == self.zkey else None
+            moves = self.order_moves(board, self.intern_moves(board.legal_moves), 0, tt_move)
 
             for i, move in enumerate(moves):
-                board.push(move)
+                self.do_move(board, move)
 
                 if i == 0:
                     score = -self.negamax(board, current_depth - 1, -beta, -alpha, 1)
@@ -508,7 +839,7 @@ class ChessEngine:
                     if score > alpha and score < beta:
                         score = -self.negamax(board, current_depth - 1, -beta, -alpha, 1)
 
-                board.pop()
+                self.undo_move(board)
 
                 if self.time_exceeded:
                     break
@@ -519,9 +850,9 @@ class ChessEngine:
                     aspirations_failed = True
                     alpha = -self.INFINITY
                     beta = self.INFINITY
-                    board.push(move)
+                    self.do_move(board, move)
                     score = -self.negamax(board, current_depth - 1, -beta, -alpha, 1)
-                    board.pop()
+                    self.undo_move(board)
 
                 if score > current_best_score:
                     current_best_score = score
@@ -30,15 +30,23 @@ Target: 12,000-18,000 nps (vs 3,000 in v5), +150-200 ELO improvement
 """
 
 import chess
+import os
+import sys
 import time
 from typing import Optional
 from dataclasses import dataclass
-from collections import defaultdict
+from array import array
+
+# Add parent directory to path to import the shared engine_base and engine_pst modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from engine_base import encode_move, trim_tt_by_age
+from engine_pst import build_pst_flat, PHASE_STEPS
 
 
 @dataclass
 class SearchResult:
     """Result from engine search."""
+    __slots__ = ('best_move', 'score', 'depth', 'nodes_searched', 'time_spent')
     best_move: chess.Move
     score: int
     depth: int
@@ -55,6 +63,7 @@ TT_BETA = 2
 @dataclass
 class TTEntry:
     """Transposition table entry with age for replacement strategy."""
+    __slots__ = ('key', 'depth', 'score', 'flag', 'best_move', 'age')
     key: int
     depth: int
     score: int
@@ -218,12 +227,21 @@ class ChessEngine:
         -50,-30,-20,-10,-10,-20,-30,-50,
     ]
 
+    # Tables indexed by piece type. Pawns and kings have None in PST_BY_TYPE
+    # and interpolate their (middlegame, endgame) pair by phase instead
+    PST_BY_TYPE = (None, None, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, None)
+    PST_BLENDED_BY_TYPE = (None, (PAWN_TABLE_MG, PAWN_TABLE_EG), None, None, None, None,
+                           (KING_TABLE_MG, KING_TABLE_EG))
+    # Both flattened per phase step, see engine_pst.build_pst_flat()
+    PST_FLAT = build_pst_flat(PST_BY_TYPE, PST_BLENDED_BY_TYPE)
+
     # Passed pawn bonus by rank
     PASSED_PAWN_BONUS = [0, 15, 25, 40, 60, 90, 130, 0]
 
     # Constants
     INFINITY = 999999
     MATE_SCORE = 100000
+    EVAL_CACHE_SIZE = 1 << 16  # Cached static evaluations before the cache is cleared
     TT_SIZE = 1 << 20
 
     # Precomputed tables for performance optimization (v6.0)
@@ -266,51 +284,39 @@ class ChessEngine:
         self.time_exceeded = False
         self.tt = {}
         self.current_age = 0  # For TT age-based replacement (v6.0)
-        self.killers = [[None, None] for _ in range(64)]
-        self.history = defaultdict(int)
+        # Two packed killer moves per ply (see encode_move): slots [2 * ply] and [2 * ply + 1]
+        self.killers = array('I', bytes(4 * 2 * 64))
+        self.history = array('q', bytes(8 * 64 * 64))  # Indexed by from_square * 64 + to_square
+        self.eval_cache = {}  # Static evaluations by board._transposition_key()
+
+        # MVV-LVA capture scores, indexed by victim_type * 8 + attacker_type
+        self.mvv_lva = [0] * 64
+        for victim in chess.PIECE_TYPES:
+            for attacker in chess.PIECE_TYPES:
+                self.mvv_lva[victim * 8 + attacker] = self.PIECE_VALUES[victim] * 10 - self.PIECE_VALUES[attacker]
         self.countermoves = {}  # Countermove heuristic (v6.0)
 
     def clear_tables(self):
         self.tt.clear()
-        self.killers = [[None, None] for _ in range(64)]
-        self.history.clear()
+        self.killers = array('I', bytes(4 * 2 * 64))
+        self.history = array('q', bytes(8 * 64 * 64))
+        self.eval_cache.clear()
         self.countermoves.clear()
 
+    def get_phase_step(self, board: chess.Board) -> int:
+        """Phase material (N/B = 1, R = 2, Q = 4) clamped to PHASE_STEPS"""
+        return min(chess.popcount(board.knights | board.bishops)
+                   + 2 * chess.popcount(board.rooks)
+                   + 4 * chess.popcount(board.queens), PHASE_STEPS)
+
     def get_game_phase(self, board: chess.Board) -> float:
         """0.0 = opening/middlegame, 1.0 = endgame"""
-        phase = 0
-        phase += len(board.pieces(chess.KNIGHT, chess.WHITE)) * 1
-        phase += len(board.pieces(chess.KNIGHT, chess.BLACK)) * 1
-        phase += len(board.pieces(chess.BISHOP, chess.WHITE)) * 1
-        phase += len(board.pieces(chess.BISHOP, chess.BLACK)) * 1
-        phase += len(board.pieces(chess.ROOK, chess.WHITE)) * 2
-        phase += len(board.pieces(chess.ROOK, chess.BLACK)) * 2
-        phase += len(board.pieces(chess.QUEEN, chess.WHITE)) * 4
-        phase += len(board.pieces(chess.QUEEN, chess.BLACK)) * 4
-        return 1.0 - min(phase / 24.0, 1.0)
+        return 1.0 - self.get_phase_step(board) / PHASE_STEPS
 
     def get_pst_value(self, piece: chess.Piece, square: int, phase: float) -> int:
         """Get piece-square table value with phase interpolation."""
-        sq = square if piece.color == chess.WHITE else chess.square_mirror(square)
-        pt = piece.piece_type
-
-        if pt == chess.PAWN:
-            mg = self.PAWN_TABLE_MG[sq]
-            eg = self.PAWN_TABLE_EG[sq]
-            return int(mg * (1 - phase) + eg * phase)
-        elif pt == chess.KNIGHT:
-            return self.KNIGHT_TABLE[sq]
-        elif pt == chess.BISHOP:
-            return self.BISHOP_TABLE[sq]
-        elif pt == chess.ROOK:
-            return self.ROOK_TABLE[sq]
-        elif pt == chess.QUEEN:
-            return self.QUEEN_TABLE[sq]
-        elif pt == chess.KING:
-            mg = self.KING_TABLE_MG[sq]
-            eg = self.KING_TABLE_EG[sq]
-            return int(mg * (1 - phase) + eg * phase)
-        return 0
+        step = round((1.0 - phase) * PHASE_STEPS)
+        return self.PST_FLAT[(step * 12 + (piece.piece_type - 1) * 2 + piece.color) * 64 + square]
 
     def evaluate_development(self, board: chess.Board, phase: float) -> int:
         """Evaluate piece development (important in opening/early middlegame)."""
@@ -438,8 +444,7 @@ class ChessEngine:
             for pt in [chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN]:
                 for sq in board.pieces(pt, color):
                     # Count squares this piece attacks
-                    attacks = board.attacks(sq)
-                    mobility = bin(attacks).count('1')
+                    mobility = chess.popcount(board.attacks_mask(sq))
                     score += sign * mobility * self.MOBILITY_BONUS[pt]
 
         return score
@@ -640,7 +645,7 @@ class ChessEngine:
             sign = 1 if color == chess.WHITE else -1
 
             # Bishop pair
-            if len(board.pieces(chess.BISHOP, color)) >= 2:
+            if chess.popcount(board.bishops & board.occupied_co[color]) >= 2:
                 score += sign * 45
 
             # Bad bishop (blocked by own pawns)
@@ -753,7 +758,7 @@ class ChessEngine:
                     elif attackers:
                         # Attacked by lesser piece?
                         min_attacker_value = min(
-                            self.PIECE_VALUES[board.piece_at(att_sq).piece_type]
+                            self.PIECE_VALUES[board.piece_type_at(att_sq)]
                             for att_sq in attackers
                         )
                         if min_attacker_value < self.PIECE_VALUES[pt]:
@@ -791,9 +796,8 @@ class ChessEngine:
             corners = [chess.A1, chess.H1, chess.A8, chess.H8]
             for knight_sq in board.pieces(chess.KNIGHT, color):
                 if knight_sq in corners:
-                    # Count mobility (v6.1 fix: use attacks() instead of legal_moves)
-                    attacks = board.attacks(knight_sq)
-                    mobility = bin(attacks).count('1')
+                    # Count mobility (v6.1 fix: use attacks_mask() instead of legal_moves)
+                    mobility = chess.popcount(board.attacks_mask(knight_sq))
                     if mobility <= 2:
                         penalty += sign * (-100)
 
@@ -826,29 +830,51 @@ class ChessEngine:
         return score
 
     def evaluate(self, board: chess.Board) -> int:
-        """Full position evaluation."""
+        """
+        Full position evaluation. The static part is cached by transposition
+        key; the fifty-move and repetition draws depend on the move history,
+        so they are checked on every call (mate still takes precedence).
+        """
+        key = board._transposition_key()
+        score = self.eval_cache.get(key)
+        if score is None:
+            if len(self.eval_cache) >= self.EVAL_CACHE_SIZE:
+                self.eval_cache.clear()
+            score = self.eval_cache[key] = self.evaluate_static(board)
+
+        if score != -self.MATE_SCORE and (board.is_fifty_moves() or board.is_repetition(2)):
+            return 0
+
+        return score
+
+    def evaluate_static(self, board: chess.Board) -> int:
+        """Evaluation of the position alone (no history-dependent draws)."""
         if board.is_checkmate():
             return -self.MATE_SCORE
 
         if board.is_stalemate() or board.is_insufficient_material():
             return 0
 
-        if board.is_fifty_moves() or board.is_repetition(2):
-            return 0
-
-        phase = self.get_game_phase(board)
+        # Game phase, material and piece-square tables in one pass over the piece
+        # bitboards: the phase step is taken from the same masks' popcounts and
+        # selects the flat PST block the pieces are then read from
+        pieces = (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)
+        step = min(chess.popcount(pieces[1] | pieces[2]) + 2 * chess.popcount(pieces[3])
+                   + 4 * chess.popcount(pieces[4]), PHASE_STEPS)
+        phase = 1.0 - step / PHASE_STEPS
         score = 0
 
-        # Material and piece-square tables
-        for square in chess.SQUARES:
-            piece = board.piece_at(square)
-            if piece:
-                value = self.PIECE_VALUES[piece.piece_type]
-                value += self.get_pst_value(piece, square, phase)
-                if piece.color == chess.WHITE:
-                    score += value
-                else:
-                    score -= value
+        piece_values = self.PIECE_VALUES
+        pst = self.PST_FLAT
+        white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+        for pt in chess.PIECE_TYPES:
+            value = piece_values[pt]
+            # Black's block comes first, White's (color == 1) 64 entries later
+            base = (step * 12 + (pt - 1) * 2) * 64
+            for square in chess.scan_forward(pieces[pt - 1] & white):
+                score += value + pst[base + 64 + square]
+            for square in chess.scan_forward(pieces[pt - 1] & black):
+                score -= value + pst[base + square]
 
         # Positional evaluation
         score += self.evaluate_development(board, phase)
@@ -877,21 +903,22 @@ class ChessEngine:
         if tt_move and move == tt_move:
             return 10000000
 
-        if board.is_capture(move):
-            victim = board.piece_at(move.to_square)
-            attacker = board.piece_at(move.from_square)
-            if victim:
-                score += 1000000 + self.PIECE_VALUES[victim.piece_type] * 10 - self.PIECE_VALUES[attacker.piece_type]
-            else:
-                score += 1000000 + 100
+        # A legal move onto an occupied square is a capture; otherwise only a
+        # pawn moving to the ep square captures (en passant)
+        victim = board.piece_type_at(move.to_square)
+        if victim:
+            score += 1000000 + self.mvv_lva[victim * 8 + board.piece_type_at(move.from_square)]
+        elif move.to_square == board.ep_square and board.pawns & chess.BB_SQUARES[move.from_square]:
+            score += 1000000 + 100
 
         if move.promotion:
             score += 900000 + self.PIECE_VALUES[move.promotion]
 
         if ply < 64:
-            if move == self.killers[ply][0]:
+            enc = encode_move(move)
+            if enc == self.killers[2 * ply]:
                 score += 800000
-            elif move == self.killers[ply][1]:
+            elif enc == self.killers[2 * ply + 1]:
                 score += 700000
 
         # Countermove heuristic (v6.0): move that refuted opponent's last move
@@ -899,21 +926,49 @@ class ChessEngine:
             if move == self.countermoves[prev_move]:
                 score += 650000
 
-        score += self.history[(move.from_square, move.to_square)]
+        score += self.history[move.from_square * 64 + move.to_square]
 
         return score
 
     def order_moves(self, board: chess.Board, moves: list, ply: int, tt_move: chess.Move = None, prev_move: chess.Move = None) -> list:
-        scored = [(self.score_move(board, m, ply, tt_move, prev_move), m) for m in moves]
-        scored.sort(key=lambda x: x[0], reverse=True)
-        return [m for _, m in scored]
+        # Sorted in place (stable, best first) instead of building score/move pairs
+        score_move = self.score_move
+        moves.sort(key=lambda m: score_move(board, m, ply, tt_move, prev_move), reverse=True)
+        return moves
+
+    def order_captures(self, board: chess.Board, moves: list) -> list:
+        """
+        Order quiescence moves (captures and quiet promotions) by MVV-LVA
+        alone: the hash move, killer and history terms of score_move() only
+        separate quiet moves. Sorted in place, best first.
+        """
+        piece_type_at = board.piece_type_at
+        mvv_lva = self.mvv_lva
+        piece_values = self.PIECE_VALUES
+
+        def score_capture(move):
+            victim = piece_type_at(move.to_square)
+            if victim:
+                score = 1000000 + mvv_lva[victim * 8 + piece_type_at(move.from_square)]
+            elif move.promotion:
+                score = 0
+            else:
+                score = 1000000 + 100  # En passant
+            if move.promotion:
+                score += 900000 + piece_values[move.promotion]
+            return score
+
+        moves.sort(key=score_capture, reverse=True)
+        return moves
 
     def store_killer(self, move: chess.Move, ply: int):
         if ply >= 64:
             return
-        if move != self.killers[ply][0]:
-            self.killers[ply][1] = self.killers[ply][0]
-            self.killers[ply][0] = move
+        enc = encode_move(move)
+        idx = 2 * ply
+        if enc != self.killers[idx]:
+            self.killers[idx + 1] = self.killers[idx]
+            self.killers[idx] = enc
 
     def quiescence(self, board: chess.Board, alpha: int, beta: int, ply: int) -> int:
         self.nodes_searched += 1
@@ -933,13 +988,16 @@ class ChessEngine:
         if stand_pat > alpha:
             alpha = stand_pat
 
-        captures = [m for m in board.legal_moves if board.is_capture(m) or m.promotion]
-        captures = self.order_moves(board, captures, ply)
+        # Only captures and promotions, generated directly rather than filtering
+        # every legal move (quiet promotions are pawn pushes to an empty back rank)
+        captures = list(board.generate_legal_captures())
+        captures.extend(board.generate_legal_moves(board.pawns, chess.BB_BACKRANKS & ~board.occupied))
+        captures = self.order_captures(board, captures)
 
         for move in captures:
             if not move.promotion:
-                victim = board.piece_at(move.to_square)
-                if victim and stand_pat + self.PIECE_VALUES[victim.piece_type] + 200 < alpha:
+                victim = board.piece_type_at(move.to_square)
+                if victim and stand_pat + self.PIECE_VALUES[victim] + 200 < alpha:
                     continue
 
             board.push(move)
@@ -995,9 +1053,10 @@ class ChessEngine:
         if in_check and depth < self.max_depth + 2:  # Was +5, now +2 for safety
             depth += 1
 
-        # Null move pruning
-        if do_null and depth >= 3 and not in_check and self.get_game_phase(board) < 0.8:
-            has_pieces = any(board.pieces(pt, board.turn) for pt in [chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN])
+        # Null move pruning (phase material >= 5 is get_game_phase() < 0.8, as an int)
+        if do_null and depth >= 3 and not in_check and self.get_phase_step(board) >= 5:
+            # Zugzwang guard: side to move must have a non-pawn piece
+            has_pieces = (board.knights | board.bishops | board.rooks | board.queens) & board.occupied_co[board.turn]
             if has_pieces:
                 board.push(chess.Move.null())
                 R = 3 if depth >= 6 else 2
@@ -1008,7 +1067,8 @@ class ChessEngine:
                 if score >= beta:
                     return beta
 
-        # Reverse Futility Pruning / Static Null Move (v6.0)
+        # Reverse Futility Pruning / Static Null Move (v6.0). The static eval is
+        # computed once here and reused by futility pruning below
         if depth <= 3 and not in_check:
             static_eval = self.evaluate(board)
             rfp_margins = [0, 120, 250, 400]  # By depth
@@ -1028,23 +1088,35 @@ class ChessEngine:
         # Futility pruning (v6.0): prune quiet moves unlikely to raise alpha
         futility_pruning = False
         if depth <= 3 and not in_check:
-            static_eval = self.evaluate(board)
             futility_margins = [0, 200, 350, 500]  # By depth
             if static_eval + futility_margins[depth] < alpha:
                 futility_pruning = True
 
+        # Bound once per node: each move's capture flag is a bitboard test taken
+        # before the push and reused by futility pruning, LMR and the
+        # history/killer updates (a pawn moving to the ep square captures en passant)
+        them = board.occupied_co[not board.turn]
+        pawns = board.pawns
+        ep_square = board.ep_square
+        bb_squares = chess.BB_SQUARES
+
         for i, move in enumerate(moves):
+            to_square = move.to_square
+            is_capture = bool(them & bb_squares[to_square]) or (
+                to_square == ep_square and bool(pawns & bb_squares[move.from_square]))
+
             # Skip quiet moves if futility pruning active
-            if futility_pruning and not board.is_capture(move) and not move.promotion:
+            if futility_pruning and not is_capture and not move.promotion:
                 continue
 
             board.push(move)
 
-            # Improved LMR with scaled reduction (v6.0)
+            # Improved LMR with scaled reduction (v6.0). Cheap flags go first so
+            # board.is_check() only runs for moves that would otherwise be reduced
             reduction = 0
-            if (i >= 3 and depth >= 3 and
-                not in_check and not board.is_check() and
-                not board.is_capture(move) and not move.promotion):
+            if (i >= 3 and depth >= 3 and not in_check and
+                not is_capture and not move.promotion and
+                not board.is_check()):
 
                 # Base reduction
                 reduction = 1
@@ -1092,15 +1164,19 @@ class ChessEngine:
             if score > alpha:
                 alpha = score
                 flag = TT_EXACT
-                if not board.is_capture(move):
-                    self.history[(move.from_square, move.to_square)] += depth * depth
+                if not is_capture:
+                    self.history[move.from_square * 64 + move.to_square] += depth * depth
 
             if alpha >= beta:
-                if not board.is_capture(move):
+                if not is_capture:
                     self.store_killer(move, ply)
                 flag = TT_BETA
                 break
 
+        # Every move was futility-pruned: fail low instead of returning -INFINITY
+        if best_score == -self.INFINITY:
+            best_score = alpha
+
         # Age-based TT replacement strategy (v6.0)
         if key in self.tt:
             old_entry = self.tt[key]
@@ -1120,6 +1196,8 @@ class ChessEngine:
         self.start_time = time.time()
         self.time_exceeded = False
         self.current_age += 1  # Increment age for TT replacement (v6.0)
+        # Make room for this search's positions, oldest searches first
+        trim_tt_by_age(self.tt, self.TT_SIZE)
 
         moves = list(board.legal_moves)
         if not moves:
@@ -1147,8 +1225,13 @@ class ChessEngine:
                 beta = self.INFINITY
                 aspirations_failed = False
 
-            tt_entry = self.tt.get(board._transposition_key())
-            tt_move = tt_entry.best_move if tt_entry else None
+            # The root position is never stored in the TT, so from depth 2 on the
+            # previous iteration's best move is the root's hash move
+            if current_depth > 1:
+                tt_move = best_move
+            else:
+                tt_entry = self.tt.get(board._transposition_key())
+                tt_move = tt_entry.best_move if tt_entry else None
             moves = self.order_moves(board, list(board.legal_moves), 0, tt_move)
 
             window_failed = False  # Track if window failed (v6.1 fix)
@@ -1,5 +1,10 @@
 import chess
+import chess.polyglot
+import random
 import time
+from array import array
+from multiprocessing import Process
+from multiprocessing.sharedctypes import RawArray
 from dataclasses import dataclass
 from typing import Optional
 
@@ -13,13 +18,116 @@ class SearchResult:
     time_spent: float
 
 
+# Transposition table bound types
+TT_EXACT = 0
+TT_LOWER = 1
+TT_UPPER = 2
+
+# Fixed-size transposition table indexed by zkey & TT_MASK. Each slot holds one
+# packed word: move (bits 0-15), score + TT_SCORE_OFFSET (bits 16-36), flag
+# (bits 37-38) and depth (bits 39-46), next to the full key XORed with that word.
+# The XOR lets Lazy SMP helpers share the table without locks: a slot torn by two
+# concurrent writers no longer matches any key and reads as a miss
+TT_SIZE = 1 << 20
+TT_MASK = TT_SIZE - 1
+TT_SCORE_OFFSET = 1 << 20
+
+# Killer moves are kept for this many plies from the root
+MAX_PLY = 64
+
+# Integer search bound, just above the mate score (99999) and well inside the
+# TT's score field, so windows and stored scores stay plain ints
+INF = 100000
+
+# Half-width of the root aspiration window; a bound that fails is pushed out
+# by the current width, which then doubles
+ASPIRATION_WINDOW = 50
+
+
+def _encode_move(move: Optional[chess.Move]) -> int:
+    if move is None:
+        return 0
+    return (move.from_square << 10) | (move.to_square << 4) | (move.promotion or 0)
+
+
+def _decode_move(enc: int) -> Optional[chess.Move]:
+    if not enc:
+        return None
+    return chess.Move(enc >> 10, (enc >> 4) & 63, (enc & 15) or None)
+
+
+# Polyglot Zobrist keys; the search XORs them in incrementally (see _push)
+ZOBRIST = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+ZOBRIST_HASHER = chess.polyglot.ZobristHasher(ZOBRIST)
+
+
+def _castling_hash(castling_rights: int) -> int:
+    key = 0
+    if castling_rights & chess.BB_H1:
+        key ^= ZOBRIST[768]
+    if castling_rights & chess.BB_A1:
+        key ^= ZOBRIST[769]
+    if castling_rights & chess.BB_H8:
+        key ^= ZOBRIST[770]
+    if castling_rights & chess.BB_A8:
+        key ^= ZOBRIST[771]
+    return key
+
+
+def _lazy_smp_helper(board: chess.Board, depth: int, time_limit: float, shared_tt, seed: int):
+    """
+    Lazy SMP helper process: searches the same root into the shared TT.
+    Its result is discarded. To explore other subtrees than the main search,
+    odd helpers run every iteration one ply deeper, and all of them seed
+    history with a little noise that is never aged away.
+    """
+    engine = ChessEngine(max_depth=depth, time_limit=time_limit, shared_tt=shared_tt)
+    rng = random.Random(seed)
+    engine.history = array('q', [rng.randrange(16) for _ in range(64 * 64)])
+    engine.depth_offset = seed % 2
+    engine.age_history = False
+    engine.search(board)
+
+
 class ChessEngine:
-    def __init__(self, max_depth: int = 6, time_limit: float = None):
+    def __init__(self, max_depth: int = 6, time_limit: float = None, threads: int = 1,
+                 shared_tt=None):
         self.max_depth = max_depth
         self.time_limit = time_limit
+        self.threads = threads
         self.nodes_count = 0
         self.start_time = 0
 
+        # History heuristic for quiet moves, indexed by from_square * 64 + to_square
+        self.history = array('q', bytes(8 * 64 * 64))
+        self.age_history = True
+
+        # Extra plies added to every iteration (Lazy SMP helpers only)
+        self.depth_offset = 0
+
+        # Two killer moves per ply, packed with _encode_move (0 = empty slot)
+        self.killers = array('i', bytes(4 * 2 * MAX_PLY))
+
+        # Transposition table keyed by the incrementally updated Zobrist key. With
+        # more than one thread it lives in shared memory so helper processes
+        # (see _lazy_smp_helper) read and write the same slots
+        if shared_tt is None and threads > 1:
+            shared_tt = (RawArray('Q', TT_SIZE), RawArray('Q', TT_SIZE))
+        self.shared_tt = shared_tt
+        if shared_tt is None:
+            self.tt_keys = array('Q', bytes(8 * TT_SIZE))
+            self.tt_data = array('Q', bytes(8 * TT_SIZE))
+        else:
+            self.tt_keys = memoryview(shared_tt[0]).cast('B').cast('Q')
+            self.tt_data = memoryview(shared_tt[1]).cast('B').cast('Q')
+        self.zkey = 0
+        self.key_stack = []
+
+        # Material + PST from white's point of view, kept up to date by _push/_pop
+        # (summed over the board once at the root) so _evaluate is one read
+        self.eval_white = 0
+        self.eval_stack = []
+
         # Piece values for material evaluation
         self.values = {
             chess.PAWN: 100,
@@ -56,38 +164,218 @@ class ChessEngine:
             # (Simplified for brevity, but usually includes all pieces)
         }
 
-    def _evaluate(self, board: chess.Board) -> int:
-        if board.is_checkmate():
-            return -99999 if board.turn == chess.WHITE else 99999
+        # MVV-LVA capture scores, indexed by victim_type * 8 + attacker_type
+        self.mvv_lva = array('i', [0] * 64)
+        for victim in chess.PIECE_TYPES:
+            for attacker in chess.PIECE_TYPES:
+                self.mvv_lva[victim * 8 + attacker] = 10 * self.values[victim] - self.values[attacker]
+
+        self.piece_square = self._build_piece_square()
+
+    def _build_piece_square(self):
+        """
+        Signed material + PST of one piece, white positive, indexed by
+        ((piece_type - 1) * 2 + color) * 64 + square: the terms _push adds and
+        removes from eval_white.
+        """
+        piece_square = array('i', bytes(4 * 12 * 64))
+        for piece_type in chess.PIECE_TYPES:
+            table = self.pst.get(piece_type)
+            for square in chess.SQUARES:
+                white = self.values[piece_type] + (table[chess.square_mirror(square)] if table else 0)
+                black = self.values[piece_type] + (table[square] if table else 0)
+                piece_square[((piece_type - 1) * 2 + chess.WHITE) * 64 + square] = white
+                piece_square[((piece_type - 1) * 2 + chess.BLACK) * 64 + square] = -black
+        return piece_square
+
+    def _push(self, board: chess.Board, move: chess.Move):
+        """board.push() that also XORs the move into self.zkey and updates eval_white."""
+        self.key_stack.append(self.zkey)
+        self.eval_stack.append(self.eval_white)
+        piece_square = self.piece_square
+
+        # Side to move flips and the old en passant file (if any) drops out
+        key = self.zkey ^ ZOBRIST[780] ^ ZOBRIST_HASHER.hash_ep_square(board)
+        old_rights = board.castling_rights
+
+        from_sq = move.from_square
+        to_sq = move.to_square
+        color = board.turn
+        piece_type = board.piece_type_at(from_sq)
+        key ^= ZOBRIST[64 * ((piece_type - 1) * 2 + color) + from_sq]
+        placed = 64 * (((move.promotion or piece_type) - 1) * 2 + color) + to_sq
+        delta = piece_square[placed] - piece_square[64 * ((piece_type - 1) * 2 + color) + from_sq]
+
+        if board.is_en_passant(move):
+            captured_index = 64 * (not color) + (to_sq - 8 if color == chess.WHITE else to_sq + 8)
+            key ^= ZOBRIST[captured_index]
+            delta -= piece_square[captured_index]
+        else:
+            captured = board.piece_type_at(to_sq)
+            if captured and board.color_at(to_sq) != color:
+                captured_index = 64 * ((captured - 1) * 2 + (not color)) + to_sq
+                key ^= ZOBRIST[captured_index]
+                delta -= piece_square[captured_index]
+
+        key ^= ZOBRIST[placed]
+
+        if piece_type == chess.KING and board.is_castling(move):
+            rank = chess.square_rank(from_sq)
+            if board.is_kingside_castling(move):
+                rook_from, rook_to = chess.square(7, rank), chess.square(5, rank)
+            else:
+                rook_from, rook_to = chess.square(0, rank), chess.square(3, rank)
+            rook_index = 64 * ((chess.ROOK - 1) * 2 + color)
+            key ^= ZOBRIST[rook_index + rook_from] ^ ZOBRIST[rook_index + rook_to]
+            delta += piece_square[rook_index + rook_to] - piece_square[rook_index + rook_from]
+
+        self.eval_white += delta
+        board.push(move)
+
+        if board.castling_rights != old_rights:
+            key ^= _castling_hash(old_rights) ^ _castling_hash(board.castling_rights)
+        self.zkey = key ^ ZOBRIST_HASHER.hash_ep_square(board)
+
+    def _game_keys(self, board: chess.Board):
+        """Keys of the game positions since the last irreversible move, oldest first."""
+        keys = []
+        replay = board.copy()
+        for _ in range(min(board.halfmove_clock, len(board.move_stack))):
+            replay.pop()
+            keys.append(chess.polyglot.zobrist_hash(replay))
+        keys.reverse()
+        return keys
 
-        score = 0
-        for piece_type in self.values:
-            # Material score
-            score += len(board.pieces(piece_type, chess.WHITE)) * self.values[piece_type]
-            score -= len(board.pieces(piece_type, chess.BLACK)) * self.values[piece_type]
+    def _push_null(self, board: chess.Board):
+        """Pass the move (null move pruning); only the side and en passant file change."""
+        self.key_stack.append(self.zkey)
+        self.eval_stack.append(self.eval_white)
+        self.zkey ^= ZOBRIST[780] ^ ZOBRIST_HASHER.hash_ep_square(board)
+        board.push(chess.Move.null())
 
-            # Positional score (PST)
-            if piece_type in self.pst:
-                for sq in board.pieces(piece_type, chess.WHITE):
-                    score += self.pst[piece_type][chess.square_mirror(sq)]
-                for sq in board.pieces(piece_type, chess.BLACK):
-                    score -= self.pst[piece_type][sq]
+    def _pop(self, board: chess.Board):
+        board.pop()
+        self.zkey = self.key_stack.pop()
+        self.eval_white = self.eval_stack.pop()
 
+    def _tt_probe(self, key: int):
+        """Return (depth, score, flag, move) for key, or None on a miss."""
+        idx = key & TT_MASK
+        data = self.tt_data[idx]
+        if self.tt_keys[idx] ^ data != key:
+            return None
+        return ((data >> 39) & 0xFF, ((data >> 16) & 0x1FFFFF) - TT_SCORE_OFFSET,
+                (data >> 37) & 3, _decode_move(data & 0xFFFF))
+
+    def _tt_store(self, key: int, depth: int, score: int, flag: int, move: Optional[chess.Move]):
+        data = (_encode_move(move) | (score + TT_SCORE_OFFSET) << 16
+                | flag << 37 | depth << 39)
+        idx = key & TT_MASK
+        self.tt_keys[idx] = key ^ data
+        self.tt_data[idx] = data
+
+    def _seed_killers_from_pv(self, board: chess.Board, best_move: chess.Move, depth: int):
+        """
+        Walk the last iteration's principal variation through the TT and make
+        its quiet moves the first killer at their ply, so the next, deeper
+        iteration tries them early in the PV's sibling nodes too.
+        """
+        killers = self.killers
+        self._push(board, best_move)
+        pushed = 1
+        for ply in range(1, min(depth, MAX_PLY)):
+            entry = self._tt_probe(self.zkey)
+            move = entry[3] if entry else None
+            if move is None or not board.is_legal(move):
+                break
+            if not board.is_capture(move):
+                encoded = _encode_move(move)
+                if killers[2 * ply] != encoded:
+                    killers[2 * ply + 1] = killers[2 * ply]
+                    killers[2 * ply] = encoded
+            self._push(board, move)
+            pushed += 1
+        for _ in range(pushed):
+            self._pop(board)
+
+    def _evaluate(self, board: chess.Board) -> int:
+        # Scores are from the side to move's view, so being mated is always -99999
+        if board.is_checkmate():
+            return -99999
+
+        # Material + PST, maintained incrementally by _push/_pop
+        score = self.eval_white
         return score if board.turn == chess.WHITE else -score
 
     def _order_moves(self, board: chess.Board, moves):
-        """MVV-LVA (Most Valuable Victim - Least Valuable Aggressor) heuristic"""
+        """
+        MVV-LVA (Most Valuable Victim - Least Valuable Aggressor) heuristic for
+        captures, which all go first; quiet moves follow by history score.
+        """
+
+        # Bound once per call: captures are found with a bitboard test against
+        # the opponent's pieces instead of board.is_capture() per move
+        mvv_lva = self.mvv_lva
+        history = self.history
+        piece_type_at = board.piece_type_at
+        bb_squares = chess.BB_SQUARES
+        them = board.occupied_co[not board.turn]
 
         def score_move(move):
-            if board.is_capture(move):
-                victim = board.piece_at(move.to_square)
-                aggressor = board.piece_at(move.from_square)
-                if victim and aggressor:
-                    return 10 * self.values[victim.piece_type] - self.values[aggressor.piece_type]
-            return 0
+            to_square = move.to_square
+            if bb_squares[to_square] & them:
+                return 1000000 + mvv_lva[piece_type_at(to_square) * 8 + piece_type_at(move.from_square)]
+            return history[move.from_square * 64 + to_square]
 
         return sorted(moves, key=score_move, reverse=True)
 
+    def _staged_moves(self, board: chess.Board, moves, tt_move: Optional[chess.Move], ply: int):
+        """
+        Yield the hash move, then captures by MVV-LVA, then quiet moves: this
+        ply's killers first and the rest by history. Each stage is sorted only
+        when the search reaches it, so a node that cuts off on the hash move or
+        a capture never sorts its quiet moves.
+        """
+        bb_squares = chess.BB_SQUARES
+        them = board.occupied_co[not board.turn]
+        captures = [move for move in moves if bb_squares[move.to_square] & them]
+        quiets = [move for move in moves if not bb_squares[move.to_square] & them]
+
+        if tt_move in moves:
+            (captures if bb_squares[tt_move.to_square] & them else quiets).remove(tt_move)
+            yield tt_move
+
+        if captures:
+            mvv_lva = self.mvv_lva
+            piece_type_at = board.piece_type_at
+            captures.sort(key=lambda move: mvv_lva[piece_type_at(move.to_square) * 8
+                                                   + piece_type_at(move.from_square)],
+                          reverse=True)
+            yield from captures
+
+        # History and killers are read now rather than at node entry, so they
+        # already hold the cutoffs found below this node's hash move and captures
+        history = self.history
+        if ply < MAX_PLY:
+            killer0 = self.killers[2 * ply]
+            killer1 = self.killers[2 * ply + 1]
+        else:
+            killer0 = killer1 = 0
+
+        def quiet_key(move):
+            from_square = move.from_square
+            to_square = move.to_square
+            if killer0:
+                encoded = from_square << 10 | to_square << 4 | (move.promotion or 0)
+                if encoded == killer0:
+                    return 1 << 62
+                if encoded == killer1:
+                    return (1 << 62) - 1
+            return history[from_square * 64 + to_square]
+
+        quiets.sort(key=quiet_key, reverse=True)
+        yield from quiets
+
     def _quiescence(self, board: chess.Board, alpha: int, beta: int) -> int:
         """Prevents 'horizon effect' by searching until captures stabilize."""
         stand_pat = self._evaluate(board)
@@ -96,10 +384,18 @@ class ChessEngine:
         if alpha < stand_pat:
             alpha = stand_pat
 
+        values = self.values
         for move in self._order_moves(board, board.generate_legal_captures()):
-            board.push(move)
+            # Delta pruning: skip captures that can't lift the score to alpha
+            # even with a 200cp positional margin (en passant captures a pawn)
+            if not move.promotion:
+                victim = board.piece_type_at(move.to_square) or chess.PAWN
+                if stand_pat + values[victim] + 200 < alpha:
+                    continue
+
+            self._push(board, move)
             score = -self._quiescence(board, -beta, -alpha)
-            board.pop()
+            self._pop(board)
 
             if score >= beta:
                 return beta
@@ -107,32 +403,81 @@ class ChessEngine:
                 alpha = score
         return alpha
 
-    def _negamax(self, board: chess.Board, depth: int, alpha: int, beta: int) -> int:
+    def _negamax(self, board: chess.Board, depth: int, alpha: int, beta: int, ply: int,
+                 do_null: bool = True) -> int:
         self.nodes_count += 1
 
         # Check time limit
         if self.time_limit and (time.time() - self.start_time) > self.time_limit:
             raise TimeoutError()
 
+        # Repetition draw: only the last halfmove_clock positions can repeat
+        # (pawn moves and captures are irreversible), and key_stack holds their keys
+        halfmove_clock = board.halfmove_clock
+        if halfmove_clock >= 4 and self.zkey in self.key_stack[-halfmove_clock:]:
+            return 0
+
+        # Transposition table probe
+        key = self.zkey
+        entry = self._tt_probe(key)
+        tt_move = None
+        if entry:
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            if tt_depth >= depth:
+                if tt_flag == TT_EXACT:
+                    return tt_score
+                if tt_flag == TT_LOWER and tt_score >= beta:
+                    return beta
+                if tt_flag == TT_UPPER and tt_score <= alpha:
+                    return alpha
+
         if depth == 0:
             return self._quiescence(board, alpha, beta)
 
-        moves = self._order_moves(board, board.legal_moves)
+        in_check = board.is_check()
+
+        # Null move pruning: if passing still fails high, a real move will too.
+        # Skipped in check, right after another null move and without a piece
+        # besides pawns and king (zugzwang)
+        if do_null and depth >= 3 and not in_check and \
+                (board.knights | board.bishops | board.rooks | board.queens) & board.occupied_co[board.turn]:
+            self._push_null(board)
+            score = -self._negamax(board, depth - 3, -beta, -beta + 1, ply + 1, False)
+            self._pop(board)
+            if score >= beta:
+                return beta
+
+        moves = list(board.legal_moves)
         if not moves:
-            return self._evaluate(board)
+            # Decide mate/stalemate from the (empty) move list we already have
+            # instead of letting _evaluate regenerate it via is_checkmate()
+            return -99999 if in_check else 0
 
-        best_score = -float('inf')
-        for move in moves:
-            board.push(move)
-            score = -self._negamax(board, depth - 1, -beta, -alpha)
-            board.pop()
+        original_alpha = alpha
+        best_move = None
+        for move in self._staged_moves(board, moves, tt_move, ply):
+            is_capture = board.is_capture(move)
+            self._push(board, move)
+            score = -self._negamax(board, depth - 1, -beta, -alpha, ply + 1)
+            self._pop(board)
 
             if score >= beta:
+                if not is_capture:
+                    self.history[move.from_square * 64 + move.to_square] += depth * depth
+                    if ply < MAX_PLY:
+                        encoded = _encode_move(move)
+                        killers = self.killers
+                        if killers[2 * ply] != encoded:
+                            killers[2 * ply + 1] = killers[2 * ply]
+                            killers[2 * ply] = encoded
+                self._tt_store(key, depth, beta, TT_LOWER, move)
                 return beta
             if score > alpha:
                 alpha = score
-            best_score = max(best_score, score)
+                best_move = move
 
+        flag = TT_EXACT if alpha > original_alpha else TT_UPPER
+        self._tt_store(key, depth, alpha, flag, best_move)
         return alpha
 
     def search(self, board: chess.Board, depth: int = None) -> SearchResult:
@@ -140,32 +485,101 @@ class ChessEngine:
         self.nodes_count = 0
         target_depth = depth or self.max_depth
         best_move = None
-        current_best_score = -float('inf')
+        current_best_score = -INF
+        self.zkey = chess.polyglot.zobrist_hash(board)
+        self.key_stack = self._game_keys(board)
+
+        # Material + PST of the root; _push/_pop update it from here
+        piece_square = self.piece_square
+        eval_white = 0
+        for piece_type in chess.PIECE_TYPES:
+            for color in chess.COLORS:
+                index = 64 * ((piece_type - 1) * 2 + color)
+                for square in chess.scan_forward(board.pieces_mask(piece_type, color)):
+                    eval_white += piece_square[index + square]
+        self.eval_white = eval_white
+        self.eval_stack = []
+        self.killers = array('i', bytes(4 * 2 * MAX_PLY))
+        root_stack_len = len(board.move_stack)
+
+        # Root moves are generated and ordered once and reused by every iteration
+        moves = self._order_moves(board, board.legal_moves)
+
+        # Lazy SMP: helpers only fill the shared TT and are stopped once this
+        # search returns
+        helpers = [Process(target=_lazy_smp_helper, daemon=True,
+                           args=(board, target_depth, self.time_limit, self.shared_tt, seed))
+                   for seed in range(1, self.threads)]
+        for helper in helpers:
+            helper.start()
 
         # Iterative Deepening
         try:
             for d in range(1, target_depth + 1):
-                alpha = -float('inf')
-                beta = float('inf')
-                moves = self._order_moves(board, board.legal_moves)
+                search_depth = d + self.depth_offset
+
+                # Aspiration window around the previous score from depth 3 on;
+                # mate scores and the first iterations use the full window
+                window = ASPIRATION_WINDOW
+                if d >= 3 and abs(current_best_score) < 99999:
+                    lower = current_best_score - window
+                    upper = current_best_score + window
+                else:
+                    lower = -INF
+                    upper = INF
 
-                temp_best_move = None
-                for move in moves:
-                    board.push(move)
-                    score = -self._negamax(board, d - 1, -beta, -alpha)
-                    board.pop()
+                # Age history so cutoffs from the latest iterations dominate
+                # (helpers keep their seeded noise instead)
+                if self.age_history:
+                    self.history = array('q', [h >> 1 for h in self.history])
 
-                    if score > alpha:
-                        alpha = score
-                        temp_best_move = move
+                while True:
+                    alpha = lower
+                    temp_best_move = None
+                    for move in moves:
+                        self._push(board, move)
+                        score = -self._negamax(board, search_depth - 1, -upper, -alpha, 1)
+                        self._pop(board)
+
+                        if score > alpha:
+                            alpha = score
+                            temp_best_move = move
+                            if score >= upper:
+                                break
+
+                    # Whatever beat the window is searched first on the re-search
+                    # and by the next iteration
+                    if temp_best_move is not None:
+                        moves.remove(temp_best_move)
+                        moves.insert(0, temp_best_move)
+
+                    if temp_best_move is None and lower > -INF:
+                        lower = max(lower - window, -INF)
+                    elif alpha >= upper and upper < INF:
+                        upper = min(upper + window, INF)
+                    else:
+                        break
+                    window *= 2
 
                 best_move = temp_best_move
                 current_best_score = alpha
+
+                # The next iteration starts with this one's principal variation
+                # as killers
+                if best_move is not None:
+                    self._seed_killers_from_pv(board, best_move, search_depth)
         except TimeoutError:
-            pass  # Return the result from the last completed depth
+            # Return the result from the last completed depth, after unwinding
+            # the moves that were on the board when time ran out
+            while len(board.move_stack) > root_stack_len:
+                self._pop(board)
+        finally:
+            for helper in helpers:
+                helper.terminate()
+                helper.join()
 
         return SearchResult(
-            best_move=best_move or list(board.legal_moves)[0],
+            best_move=best_move or next(iter(board.legal_moves), None),
             score=current_best_score,
             depth=d if 'd' in locals() else 0,
             nodes_searched=self.nodes_count,
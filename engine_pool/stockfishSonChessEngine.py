@@ -285,7 +285,7 @@ class ChessEngine:
 
         if best_move_uci is None:
             # Fallback to any legal move
-            best_move = list(board.legal_moves)[0]
+            best_move = next(iter(board.legal_moves), None)
             score = 0
         else:
             best_move = chess.Move.from_uci(best_move_uci)
@@ -9,6 +9,7 @@ mirrored for Black pieces.
 """
 
 import chess
+from array import array
 
 
 # Pawn tables with middlegame/endgame variants
@@ -112,6 +113,13 @@ KING_TABLE_EG = [
 ]
 
 
+# Tables indexed by piece type. Pawns and kings have None in PST_BY_TYPE and
+# interpolate their (middlegame, endgame) pair by phase instead
+PST_BY_TYPE = (None, None, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, None)
+PST_BLENDED_BY_TYPE = (None, (PAWN_TABLE_MG, PAWN_TABLE_EG), None, None, None, None,
+                       (KING_TABLE_MG, KING_TABLE_EG))
+
+
 def get_pst_value(piece: chess.Piece, square: int, phase: float = 0.0) -> int:
     """
     Get piece-square table value for a piece on a square.
@@ -129,22 +137,55 @@ def get_pst_value(piece: chess.Piece, square: int, phase: float = 0.0) -> int:
     """
     # Mirror square for Black pieces (PSTs are from White's perspective)
     sq = square if piece.color == chess.WHITE else chess.square_mirror(square)
-    pt = piece.piece_type
-
-    if pt == chess.PAWN:
-        mg = PAWN_TABLE_MG[sq]
-        eg = PAWN_TABLE_EG[sq]
-        return int(mg * (1 - phase) + eg * phase)
-    elif pt == chess.KNIGHT:
-        return KNIGHT_TABLE[sq]
-    elif pt == chess.BISHOP:
-        return BISHOP_TABLE[sq]
-    elif pt == chess.ROOK:
-        return ROOK_TABLE[sq]
-    elif pt == chess.QUEEN:
-        return QUEEN_TABLE[sq]
-    elif pt == chess.KING:
-        mg = KING_TABLE_MG[sq]
-        eg = KING_TABLE_EG[sq]
-        return int(mg * (1 - phase) + eg * phase)
-    return 0
+
+    table = PST_BY_TYPE[piece.piece_type]
+    if table is not None:
+        return table[sq]
+    mg_table, eg_table = PST_BLENDED_BY_TYPE[piece.piece_type]
+    return int(mg_table[sq] * (1 - phase) + eg_table[sq] * phase)
+
+
+# Phase material (N/B = 1, R = 2, Q = 4) runs 0..24, so the interpolated pawn
+# and king tables only ever take this many + 1 distinct shapes
+PHASE_STEPS = 24
+
+
+def build_pst_flat(pst_by_type: tuple = PST_BY_TYPE,
+                   blended_by_type: tuple = PST_BLENDED_BY_TYPE) -> array:
+    """
+    Flatten piece-square tables into one array for bitboard evaluation.
+
+    The array is indexed by (step * 12 + (piece_type - 1) * 2 + color) * 64 + square,
+    where step is the clamped phase material (see engine_base.get_phase_step).
+    Black's squares are already mirrored. With the default tables each entry
+    equals get_pst_value() for that piece, square and phase; engines with
+    their own tables pass them in the same layout.
+
+    Entries are signed bytes, so all 25 phase steps take 19200 bytes; a
+    table value outside -128..127 raises OverflowError here.
+
+    Args:
+        pst_by_type: Single tables indexed by piece type (None for blended pieces)
+        blended_by_type: (middlegame, endgame) pairs indexed by piece type,
+            interpolated per phase step
+
+    Returns:
+        array: Signed byte table of (PHASE_STEPS + 1) * 12 * 64 entries
+    """
+    flat = array('b', bytes((PHASE_STEPS + 1) * 12 * 64))
+    for step in range(PHASE_STEPS + 1):
+        phase = 1.0 - step / PHASE_STEPS
+        for pt in chess.PIECE_TYPES:
+            for color in chess.COLORS:
+                base = (step * 12 + (pt - 1) * 2 + color) * 64
+                for square in chess.SQUARES:
+                    sq = square if color == chess.WHITE else chess.square_mirror(square)
+                    if pst_by_type[pt] is not None:
+                        flat[base + square] = pst_by_type[pt][sq]
+                    else:
+                        mg, eg = blended_by_type[pt]
+                        flat[base + square] = int(mg[sq] * (1 - phase) + eg[sq] * phase)
+    return flat
+
+
+PST_FLAT = build_pst_flat()